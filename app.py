@@ -1,25 +1,150 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, Response, stream_with_context, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, cast, event, func, inspect, or_, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+import multiprocessing
 import uuid
 import qrcode
 import io
 import base64
+import bisect
+import csv
+import hashlib
+import heapq
+import itertools
 import json
+import math
+import operator
 import os
+import threading
+import time
+import zipfile
+import zlib
+
+from label_render import LABEL_SIZE, render_label, render_label_args
+
+try:
+    import fcntl
+except ImportError:  # Windows: run a single process, where the RFID log needs no file locks
+    fcntl = None
 
 app = Flask(__name__, static_folder='static')
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///asset_tracking.db'
+database_url = os.environ.get('DATABASE_URL', 'sqlite:///asset_tracking.db')
+if database_url.startswith('postgres://'):
+    database_url = 'postgresql://' + database_url[len('postgres://'):]
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['BULK_COPY_THRESHOLD'] = int(os.environ.get('BULK_COPY_THRESHOLD', 1000))
+app.config['QR_CACHE_SIZE'] = int(os.environ.get('QR_CACHE_SIZE', 2048))
+app.config['QR_DISK_CACHE_DIR'] = os.environ.get('QR_DISK_CACHE_DIR')  # unset disables the disk tier
+app.config['LABEL_WORKERS'] = int(os.environ.get('LABEL_WORKERS', os.cpu_count() or 1))
+app.config['LABEL_JOB_MAX'] = int(os.environ.get('LABEL_JOB_MAX', 5000))
+app.config['API_PAGE_DEFAULT'] = int(os.environ.get('API_PAGE_DEFAULT', 100))
+app.config['API_PAGE_MAX'] = int(os.environ.get('API_PAGE_MAX', 1000))
+app.config['API_STREAM_BATCH_SIZE'] = int(os.environ.get('API_STREAM_BATCH_SIZE', 1000))
+
+# Production mode: WAL journaling, tuned pragmas and a pool sized for threaded serving
+app.config['SQLITE_PRODUCTION_TUNING'] = os.environ.get(
+    'SQLITE_PRODUCTION_TUNING', '1' if os.environ.get('FLASK_ENV') == 'production' else '0') == '1'
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536)),  # negative means KiB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),
+    'temp_store': 'MEMORY'
+}
+if app.config['SQLITE_PRODUCTION_TUNING'] or not database_url.startswith('sqlite'):
+    engine_options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    }
+    if database_url.startswith('sqlite'):
+        engine_options['connect_args'] = {
+            'timeout': app.config['SQLITE_PRAGMAS']['busy_timeout'] / 1000,
+            'check_same_thread': False
+        }
+    else:
+        engine_options['pool_recycle'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+        engine_options['pool_pre_ping'] = True
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+app.config['RFID_BATCH_MAX_EVENTS'] = int(os.environ.get('RFID_BATCH_MAX_EVENTS', 5000))
+app.config['RFID_QUEUE_ENABLED'] = os.environ.get('RFID_QUEUE_ENABLED', '1') == '1'
+app.config['RFID_QUEUE_PATH'] = os.environ.get('RFID_QUEUE_PATH', os.path.join(app.instance_path, 'rfid_events.log'))
+app.config['RFID_QUEUE_BATCH_SIZE'] = int(os.environ.get('RFID_QUEUE_BATCH_SIZE', 500))
+app.config['RFID_QUEUE_FSYNC'] = os.environ.get('RFID_QUEUE_FSYNC', '0') == '1'
+app.config['RFID_DEDUP_WINDOW_SECONDS'] = float(os.environ.get('RFID_DEDUP_WINDOW_SECONDS', 5))
+app.config['RFID_DEDUP_MAX_KEYS'] = int(os.environ.get('RFID_DEDUP_MAX_KEYS', 100000))
+
+# Background alert sweeper; one worker per host is elected to run it
+app.config['ALERT_SWEEP_ENABLED'] = os.environ.get('ALERT_SWEEP_ENABLED', '1') == '1'
+app.config['ALERT_SWEEP_SECONDS'] = float(os.environ.get('ALERT_SWEEP_SECONDS', 300))
+
+# Location-mismatch alerts need this many consecutive mismatching reads spanning this many seconds
+app.config['LOCATION_MISMATCH_MIN_READS'] = int(os.environ.get('LOCATION_MISMATCH_MIN_READS', 3))
+app.config['LOCATION_MISMATCH_MIN_SECONDS'] = float(os.environ.get('LOCATION_MISMATCH_MIN_SECONDS', 30))
+
+# Overdue-usage scheduler; safe to run in every worker
+app.config['OVERDUE_SCHEDULER_ENABLED'] = os.environ.get('OVERDUE_SCHEDULER_ENABLED', '1') == '1'
+
+# Process-local fleet state cache; each worker polls the asset change sequence at most this often
+app.config['FLEET_CACHE_SYNC_SECONDS'] = float(os.environ.get('FLEET_CACHE_SYNC_SECONDS', 1.0))
+
+# Server-Sent Events: messages buffered per client before the oldest are dropped, and the client cap per process
+app.config['SSE_CLIENT_BUFFER'] = int(os.environ.get('SSE_CLIENT_BUFFER', 256))
+app.config['SSE_MAX_CLIENTS'] = int(os.environ.get('SSE_MAX_CLIENTS', 100))
+app.config['SSE_HEARTBEAT_SECONDS'] = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+
+# Location history compaction: raw reads -> dwell intervals -> daily summaries; one worker per host is elected to run it
+app.config['LOCATION_COMPACT_ENABLED'] = os.environ.get('LOCATION_COMPACT_ENABLED', '1') == '1'
+app.config['LOCATION_COMPACT_SECONDS'] = float(os.environ.get('LOCATION_COMPACT_SECONDS', 600))
+app.config['LOCATION_RAW_RETENTION_HOURS'] = float(os.environ.get('LOCATION_RAW_RETENTION_HOURS', 48))
+app.config['LOCATION_DWELL_RETENTION_DAYS'] = float(os.environ.get('LOCATION_DWELL_RETENTION_DAYS', 90))
+
+# Fleet state checkpoints for point-in-time queries: after this many logged events, or this long if any; one worker per host is elected
+app.config['FLEET_CHECKPOINT_ENABLED'] = os.environ.get('FLEET_CHECKPOINT_ENABLED', '1') == '1'
+app.config['FLEET_CHECKPOINT_EVENTS'] = int(os.environ.get('FLEET_CHECKPOINT_EVENTS', 20000))
+app.config['FLEET_CHECKPOINT_SECONDS'] = float(os.environ.get('FLEET_CHECKPOINT_SECONDS', 86400))
+
+# Utilization reports for a window are reused for this long
+app.config['UTILIZATION_CACHE_SECONDS'] = float(os.environ.get('UTILIZATION_CACHE_SECONDS', 300))
+
+# Logged-in users are served from a per-process cache for this long; user writes invalidate it immediately
+app.config['USER_CACHE_SECONDS'] = float(os.environ.get('USER_CACHE_SECONDS', 60))
+# Count SQL statements per request and report them in an X-DB-Queries response header
+app.config['DB_QUERY_COUNTING'] = os.environ.get('DB_QUERY_COUNTING', '1') == '1'
 
 db = SQLAlchemy(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the production pragmas to every new pooled SQLite connection"""
+    if not app.config['SQLITE_PRODUCTION_TUNING']:
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f'PRAGMA {pragma} = {value}')
+    cursor.close()
+
+# Only the app's own engine is tuned; scripts that open their own engines keep SQLite defaults
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        event.listen(db.engine, 'connect', apply_sqlite_pragmas)
+
 # Database Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -44,13 +169,20 @@ class Asset(db.Model):
     expected_lifespan = db.Column(db.Integer)  # in months
     vendor = db.Column(db.String(200))
     rental_rate = db.Column(db.Float)
-    qr_code = db.Column(db.String(500))
+    qr_code = db.deferred(db.Column(db.String(500)))  # legacy data URLs; images are served by /qr/<asset_id>.png
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger)  # bumped on every insert/update, see _sequence_asset_changes
+
+    __table_args__ = (
+        db.Index('ix_asset_ownership_status', 'ownership', 'status'),
+        db.Index('ix_asset_change_seq', 'change_seq'),
+        db.Index('ix_asset_last_usage', 'last_usage'),
+    )
 
 class AssetUsage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # null for RFID-started usages
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime)
     expected_duration = db.Column(db.Integer)  # in hours
@@ -60,6 +192,151 @@ class AssetUsage(db.Model):
     status = db.Column(db.String(50), default='active')  # active, completed, overdue
     notes = db.Column(db.Text)
 
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_asset_usage_asset_status', 'asset_id', 'status'),
+        db.Index('ix_asset_usage_asset_start', 'asset_id', 'start_time'),
+        db.Index('ix_asset_usage_status', 'status'),
+    )
+
+class UsageRollup(db.Model):
+    """Hourly usage totals per department and category, maintained as usages start and end"""
+    id = db.Column(db.Integer, primary_key=True)
+    department = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)  # truncated to the hour
+    usages_started = db.Column(db.Integer, nullable=False, default=0)
+    usages_completed = db.Column(db.Integer, nullable=False, default=0)
+    busy_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint('department', 'category', 'bucket_start', name='uq_usage_rollup_bucket'),
+        db.Index('ix_usage_rollup_bucket', 'bucket_start'),
+    )
+
+class LocationRead(db.Model):
+    """Raw RFID reads, appended in batches and compacted into LocationDwell after a retention window"""
+    id = db.Column(db.Integer, primary_key=True)
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), nullable=False)
+    location = db.Column(db.String(100), nullable=False)
+    event_type = db.Column(db.String(20))
+    read_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_location_read_asset_time', 'asset_id', 'read_at'),
+        db.Index('ix_location_read_time', 'read_at'),
+    )
+
+class LocationDwell(db.Model):
+    """A stay at one location: from the first read there until the first read elsewhere"""
+    id = db.Column(db.Integer, primary_key=True)
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), nullable=False)
+    location = db.Column(db.String(100), nullable=False)
+    entered_at = db.Column(db.DateTime, nullable=False)
+    last_seen_at = db.Column(db.DateTime, nullable=False)
+    left_at = db.Column(db.DateTime)  # null for each asset's latest dwell
+    reads = db.Column(db.Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        db.Index('ix_location_dwell_asset_entered', 'asset_id', 'entered_at'),
+        db.Index('ix_location_dwell_left', 'left_at'),
+    )
+
+class LocationDaily(db.Model):
+    """Time spent per asset, location and day once dwells age out"""
+    id = db.Column(db.Integer, primary_key=True)
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    location = db.Column(db.String(100), nullable=False)
+    dwell_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    visits = db.Column(db.Integer, nullable=False, default=0)
+    reads = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('asset_id', 'day', 'location', name='uq_location_daily'),
+    )
+
+class LocationVisit(db.Model):
+    """Each asset's current stay as placed by RFID reads, the state movement analytics fold onto"""
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), primary_key=True)
+    location = db.Column(db.String(100), nullable=False)
+    entered_at = db.Column(db.DateTime, nullable=False)
+    last_seen_at = db.Column(db.DateTime, nullable=False)
+
+class LocationFlow(db.Model):
+    """Moves between locations per day and category, counted as reads arrive"""
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    from_location = db.Column(db.String(100), nullable=False)
+    to_location = db.Column(db.String(100), nullable=False)
+    moves = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'category', 'from_location', 'to_location', name='uq_location_flow'),
+    )
+
+class DwellRollup(db.Model):
+    """Histogram of finished stays per day (of leaving), category and location in log-scaled buckets"""
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    location = db.Column(db.String(100), nullable=False)
+    bucket = db.Column(db.Integer, nullable=False)
+    visits = db.Column(db.Integer, nullable=False, default=0)
+    dwell_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'category', 'location', 'bucket', name='uq_dwell_rollup'),
+    )
+
+class FleetEvent(db.Model):
+    """Append-only log of asset and usage state changes, replayed for point-in-time queries"""
+    id = db.Column(db.Integer, primary_key=True)
+    occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    asset_id = db.Column(db.Integer, nullable=False)  # no foreign key: events outlive deleted assets
+    asset_tag = db.Column(db.String(50))
+    event_type = db.Column(db.String(30), nullable=False)  # created, updated, deleted, usage_started, usage_overdue, usage_ended
+    source = db.Column(db.String(100))  # endpoint that made the change, or 'background'
+    status = db.Column(db.String(50))  # null: unchanged
+    location = db.Column(db.String(100))  # null: unchanged
+    usage_id = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index('ix_fleet_event_occurred', 'occurred_at'),
+        db.Index('ix_fleet_event_asset_occurred', 'asset_id', 'occurred_at'),
+    )
+
+class FleetCheckpoint(db.Model):
+    """Compressed fleet state as of a position in the event log"""
+    id = db.Column(db.Integer, primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False)
+    last_event_id = db.Column(db.Integer, nullable=False)
+    asset_count = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON, see FleetHistory.encode
+
+    __table_args__ = (
+        db.Index('ix_fleet_checkpoint_taken', 'taken_at'),
+    )
+
+class ChangeCounter(db.Model):
+    """Named, monotonically increasing sequence counters"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class AssetTombstone(db.Model):
+    """Deleted assets, kept so delta-sync clients learn about removals"""
+    id = db.Column(db.Integer, primary_key=True)
+    asset_pk = db.Column(db.Integer, nullable=False)  # Asset.id of the deleted row
+    asset_id = db.Column(db.String(50), nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_asset_tombstone_change_seq', 'change_seq'),
+    )
+
 class AssetSOP(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     asset_category = db.Column(db.String(100), nullable=False)
@@ -75,10 +352,1549 @@ class Alert(db.Model):
     severity = db.Column(db.String(50), default='medium')  # low, medium, high, critical
     is_resolved = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    fingerprint = db.Column(db.String(200))  # see alert_fingerprint; repeats fold into the open alert
+    occurrences = db.Column(db.Integer, default=1)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_alert_resolved_created', 'is_resolved', 'created_at'),
+        db.Index('ix_alert_type_asset_open', 'alert_type', 'asset_id', 'is_resolved'),
+        db.Index('ix_alert_fingerprint_open', 'fingerprint', 'is_resolved'),
+    )
+
+# At most one open alert per fingerprint, so concurrent raise_alerts calls fold instead of duplicating
+OPEN_ALERT = Alert.is_resolved.is_(False)
+db.Index('ux_alert_open_fingerprint', Alert.fingerprint, unique=True,
+         sqlite_where=OPEN_ALERT, postgresql_where=OPEN_ALERT)
+
+class MaintenanceRecord(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), nullable=False)
+    performed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    maintenance_type = db.Column(db.String(50), default='preventive')  # preventive, corrective, inspection
+    performed_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    notes = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_maintenance_record_asset_performed', 'asset_id', 'performed_at'),
+    )
+
+class CachedUser(UserMixin):
+    """Detached, read-only copy of a User for current_user; never carries the password hash"""
+    __slots__ = ('id', 'username', 'email', 'department', 'role', 'created_at')
+    COLUMNS = (User.id, User.username, User.email, User.department, User.role, User.created_at)
+
+    def __init__(self, id, username, email, department, role, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.department = department
+        self.role = role
+        self.created_at = created_at
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+class UserCache:
+    """Per-process TTL cache behind the login manager's user loader.
+
+    Entries expire after ttl seconds as a backstop for writes made by other
+    processes; writes through this process's session invalidate them on commit.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._users = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, user_pk):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_pk)
+            if entry is not None and entry[0] > now:
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        row = db.session.execute(select(*CachedUser.COLUMNS).where(User.id == user_pk)).first()
+        if row is None:
+            return None
+        user = CachedUser(*row)
+        if self.ttl > 0:
+            with self._lock:
+                self._users[user_pk] = (now + self.ttl, user)
+        return user
+
+    def invalidate(self, user_pks=None):
+        """Drop the given users, or everyone when user_pks is None"""
+        with self._lock:
+            if user_pks is None:
+                self._users.clear()
+            else:
+                for user_pk in user_pks:
+                    self._users.pop(user_pk, None)
+            self.stats['invalidations'] += 1
+
+    def snapshot_stats(self):
+        with self._lock:
+            return dict(self.stats, cached=len(self._users), ttl_seconds=self.ttl)
+
+user_cache = UserCache(app.config['USER_CACHE_SECONDS'])
+
+@login_manager.user_loader
+def load_user(user_id):
+    return user_cache.get(int(user_id))
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_user_changes(session, flush_context):
+    changed = {obj.id for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault('user_changes', set()).update(changed)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_user_changes(session):
+    changed = session.info.pop('user_changes', None)
+    if changed:
+        user_cache.invalidate(changed)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_user_changes(session):
+    session.info.pop('user_changes', None)
+
+class QueryStats:
+    """Per-endpoint request and SQL statement totals, fed by the query counter"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, queries):
+        with self._lock:
+            totals = self._endpoints.setdefault(endpoint, {'requests': 0, 'queries': 0, 'max_queries': 0})
+            totals['requests'] += 1
+            totals['queries'] += queries
+            totals['max_queries'] = max(totals['max_queries'], queries)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(totals, mean_queries=round(totals['queries'] / totals['requests'], 2))
+                    for endpoint, totals in self._endpoints.items()}
+
+query_stats = QueryStats()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    # Background threads run under an app context but never a request context
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+
+def _relax_usage_user_id(conn):
+    """Rebuild asset_usage on SQLite so RFID-started usages may have no user"""
+    columns = conn.exec_driver_sql('PRAGMA table_info(asset_usage)').fetchall()
+    if not any(column[1] == 'user_id' and column[3] for column in columns):
+        return
+
+    conn.exec_driver_sql('ALTER TABLE asset_usage RENAME TO asset_usage_old')
+    old_indexes = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'asset_usage_old' AND sql IS NOT NULL"
+    ).fetchall()
+    for (name,) in old_indexes:
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+    AssetUsage.__table__.create(conn)
+    shared = ', '.join(column[1] for column in columns if column[1] in AssetUsage.__table__.columns)
+    conn.exec_driver_sql(f'INSERT INTO asset_usage ({shared}) SELECT {shared} FROM asset_usage_old')
+    conn.exec_driver_sql('DROP TABLE asset_usage_old')
+
+def upgrade_schema(engine=None):
+    """Bring an existing database up to date with the models.
+
+    db.create_all() only creates missing tables, so databases created by
+    earlier versions also need new columns and indexes added in place.
+    """
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        if inspect(conn).has_table('asset_usage'):
+            if conn.dialect.name == 'sqlite':
+                _relax_usage_user_id(conn)
+            elif conn.dialect.name == 'postgresql':
+                user_column = next(column for column in inspect(conn).get_columns('asset_usage')
+                                   if column['name'] == 'user_id')
+                if not user_column['nullable']:
+                    conn.exec_driver_sql('ALTER TABLE asset_usage ALTER COLUMN user_id DROP NOT NULL')
+
+        inspector = inspect(conn)
+        preparer = conn.dialect.identifier_preparer
+        existing_tables = set(inspector.get_table_names())
+        created = set()
+        indexes = []
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                table.create(conn)
+                created.add(table.name)
+                if table.name == UsageRollup.__tablename__:
+                    rebuild_usage_rollups(conn)
+                continue
+
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    conn.exec_driver_sql(
+                        f'ALTER TABLE {preparer.format_table(table)} '
+                        f'ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}'
+                    )
+            indexes.extend(table.indexes)
+
+        # Movement analytics span three tables, so backfill once all of them exist
+        if LocationVisit.__tablename__ in created:
+            rebuild_movement_analytics(conn)
+
+        # Number assets that predate change tracking so a since=0 sync still returns them
+        top = conn.execute(select(func.max(Asset.id)).where(Asset.change_seq.is_(None))).scalar()
+        if top:
+            base = reserve_change_seqs(conn, 'asset', top) - top
+            conn.execute(Asset.__table__.update().where(Asset.change_seq.is_(None))
+                         .values(change_seq=Asset.id + base))
+
+        # Fingerprint alerts raised before de-duplication existed
+        alerts = Alert.__table__
+        conn.execute(alerts.update().where(alerts.c.fingerprint.is_(None)).values(
+            fingerprint=alerts.c.alert_type + ':' + cast(alerts.c.asset_id, db.String),
+            occurrences=func.coalesce(alerts.c.occurrences, 1),
+            last_seen=func.coalesce(alerts.c.last_seen, alerts.c.created_at)
+        ))
+
+        # Close all but the newest open alert per fingerprint so the unique open-alert index can be built
+        newest_open = select(func.max(alerts.c.id)).where(alerts.c.is_resolved.is_(False)) \
+            .group_by(alerts.c.fingerprint).scalar_subquery()
+        conn.execute(alerts.update().where(alerts.c.is_resolved.is_(False), alerts.c.id.not_in(newest_open))
+                     .values(is_resolved=True, resolved_at=datetime.utcnow()))
+
+        # QR images are rendered on demand; drop the base64 copies stored by older versions, on the first
+        # upgrade only (the counter counts upgrades, so it is 1 exactly once)
+        if reserve_change_seqs(conn, 'qr_code_cleanup', 1) == 1:
+            conn.execute(Asset.__table__.update().where(Asset.qr_code.isnot(None)).values(qr_code=None))
+
+        # Indexes last: some are unique and rely on the data fixes above
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+
+class LeaderLock:
+    """Exclusive lock file that elects one process to run a background service.
+
+    Every gunicorn worker starts the service thread with the same settings;
+    each thread calls acquire() first, which blocks until no other process
+    holds the lock, so exactly one runs it and a surviving worker takes over
+    when the holder exits (the OS drops the lock with the process). Only
+    processes on one host are coordinated. Without fcntl every process
+    holds the lock.
+    """
+
+    POLL_SECONDS = 1.0
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        """Block until this process holds the lock; it is kept until the process exits"""
+        if self._file is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock_file = open(self.path, 'a')
+        while fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(self.POLL_SECONDS)
+        self._file = lock_file
+
+def reserve_change_seqs(conn, name, count):
+    """Advance a named counter by count and return its new value.
+
+    The UPDATE keeps the counter row locked until commit, so transactions
+    publish their sequence numbers in the order they took them and a
+    client that has seen seq N can never later miss a change below N.
+    """
+    counters = ChangeCounter.__table__
+    result = conn.execute(counters.update().where(counters.c.name == name)
+                          .values(value=counters.c.value + count))
+    if result.rowcount == 0:
+        conn.execute(counters.insert().values(name=name, value=count))
+        return count
+    return conn.execute(select(counters.c.value).where(counters.c.name == name)).scalar_one()
+
+@event.listens_for(db.session, 'before_flush')
+def _sequence_asset_changes(session, flush_context, instances):
+    """Stamp inserted/updated assets with a change sequence and tombstone deleted ones"""
+    changed = [obj for obj in session.new if isinstance(obj, Asset)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, Asset) and session.is_modified(obj, include_collections=False)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Asset)]
+    if not changed and not deleted:
+        return
+
+    seq = reserve_change_seqs(session.connection(), 'asset', len(changed) + len(deleted)) \
+        - len(changed) - len(deleted)
+    for asset in changed:
+        seq += 1
+        asset.change_seq = seq
+    for asset in deleted:
+        seq += 1
+        session.add(AssetTombstone(asset_pk=asset.id, asset_id=asset.asset_id, change_seq=seq))
+
+def asset_change_version():
+    """Latest asset change sequence number handed out (0 before any change)"""
+    return db.session.execute(
+        select(ChangeCounter.value).where(ChangeCounter.name == 'asset')
+    ).scalar() or 0
+
+class AssetState:
+    """Compact snapshot of the asset fields needed to answer scans"""
+    __slots__ = ('id', 'asset_id', 'name', 'category', 'status', 'ownership', 'location', 'change_seq',
+                 'last_usage', 'purchase_date')
+
+    def __init__(self, id, asset_id, name, category, status, ownership, location, change_seq,
+                 last_usage=None, purchase_date=None):
+        self.id = id
+        self.asset_id = asset_id
+        self.name = name
+        self.category = category
+        self.status = status
+        self.ownership = ownership
+        self.location = location
+        self.change_seq = change_seq
+        self.last_usage = last_usage
+        self.purchase_date = purchase_date
+
+    @classmethod
+    def from_asset(cls, asset):
+        return cls(asset.id, asset.asset_id, asset.name, asset.category, asset.status,
+                   asset.ownership, asset.location, asset.change_seq, asset.last_usage, asset.purchase_date)
+
+FLEET_STATE_COLUMNS = (Asset.id, Asset.asset_id, Asset.name, Asset.category, Asset.status,
+                       Asset.ownership, Asset.location, Asset.change_seq, Asset.last_usage, Asset.purchase_date)
+
+class FleetStateCache:
+    """Process-local map of asset_id -> AssetState.
+
+    Commits made by this process update it directly (see the session hooks
+    below). Other workers' writes are picked up by comparing the asset
+    change counter with the version this cache last synced to, at most once
+    per sync interval, and pulling only the rows and tombstones past it.
+    Scans in between are answered without touching the database.
+
+    Listeners added with add_listener are called, outside the lock, with a
+    list of (record, previous) pairs for every asset whose cached state
+    changed; record is None for deletions.
+    """
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self._records = {}
+        self._version = None  # None until warmed
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.stats = {'hits': 0, 'misses': 0, 'warms': 0, 'syncs': 0, 'synced_changes': 0, 'local_updates': 0}
+
+    def warm(self):
+        """Load every asset with one column-projected query"""
+        # Read the version first so changes committed during the load are re-pulled on the next sync
+        version = asset_change_version()
+        records = {row.asset_id: AssetState(*row) for row in db.session.execute(select(*FLEET_STATE_COLUMNS))}
+        with self._lock:
+            self._records = records
+            self._version = version
+            self._checked = time.monotonic()
+        self.stats['warms'] += 1
+
+    def sync(self, force=False):
+        """Apply changes made by other processes since the last sync"""
+        if self._version is None:
+            self.warm()
+            return
+        now = time.monotonic()
+        if not force and now - self._checked < self.sync_interval:
+            return
+        self._checked = now
+
+        version = asset_change_version()
+        since = self._version
+        if version <= since:
+            return
+        changed = db.session.execute(select(*FLEET_STATE_COLUMNS).where(Asset.change_seq > since)).all()
+        deleted = db.session.execute(
+            select(AssetTombstone.change_seq, AssetTombstone.asset_pk, AssetTombstone.asset_id)
+            .where(AssetTombstone.change_seq > since)
+        ).all()
+        with self._lock:
+            updates = [self._put(AssetState(*row)) for row in changed]
+            updates += [self._drop(asset_id, asset_pk, seq) for seq, asset_pk, asset_id in deleted]
+            self._version = max(self._version, version)
+        self.stats['syncs'] += 1
+        self.stats['synced_changes'] += len(changed) + len(deleted)
+        self._notify(updates)
+
+    def _put(self, record):
+        """Store record unless a newer state is cached; return (record, previous) if the state changed"""
+        current = self._records.get(record.asset_id)
+        if current is None or current.id != record.id or (current.change_seq or 0) <= (record.change_seq or 0):
+            self._records[record.asset_id] = record
+            if current is None or current.id != record.id or current.change_seq != record.change_seq:
+                return record, current
+        return None
+
+    def _drop(self, asset_id, asset_pk, seq):
+        current = self._records.get(asset_id)
+        if current is not None and current.id == asset_pk and (current.change_seq or 0) <= seq:
+            del self._records[asset_id]
+            return None, current
+        return None
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, updates):
+        updates = [update for update in updates if update is not None]
+        if updates:
+            for callback in self._listeners:
+                callback(updates)
+
+    def apply(self, changes):
+        """Apply (record, None) upserts and (None, (asset_id, pk, seq)) deletes committed locally"""
+        with self._lock:
+            updates = [self._put(record) if record is not None else self._drop(*removal)
+                       for record, removal in changes]
+        self.stats['local_updates'] += len(changes)
+        self._notify(updates)
+
+    def get(self, asset_id):
+        """Return the AssetState for asset_id, or None if no such asset exists"""
+        self.sync()
+        record = self._records.get(asset_id)
+        if record is not None:
+            self.stats['hits'] += 1
+            return record
+
+        # Assets created elsewhere since the last sync, or unknown tags
+        self.stats['misses'] += 1
+        row = db.session.execute(select(*FLEET_STATE_COLUMNS).where(Asset.asset_id == asset_id)).first()
+        if row is None:
+            return None
+        record = AssetState(*row)
+        with self._lock:
+            update = self._put(record)
+        self._notify([update])
+        return record
+
+    def snapshot_stats(self):
+        return {'assets': len(self._records), 'version': self._version,
+                'sync_interval_seconds': self.sync_interval, **self.stats}
+
+fleet_cache = FleetStateCache(app.config['FLEET_CACHE_SYNC_SECONDS'])
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else float('nan')
+
+class FleetSnapshot:
+    """Read-only, column-oriented copy of the fleet for analytics.
+
+    String columns are dictionary-encoded: values[column] lists the distinct
+    strings and codes[column] holds one index into it per asset. Timestamps
+    are UTC epoch seconds with NaN for missing values. A 70k-asset fleet fits
+    in a few MB and can be grouped or filtered without touching the ORM.
+
+    After the first load the snapshot is kept current from fleet cache
+    changes (see apply): an updated asset rewrites its slot, a new one is
+    appended and a deleted one is swapped with the last slot, so rows are
+    not kept in id order. Reads and updates share one lock.
+    """
+
+    STRING_COLUMNS = ('status', 'category', 'location', 'ownership')
+    TIME_COLUMNS = ('last_usage', 'purchase_date')
+
+    def __init__(self, version):
+        self.version = version
+        self.ids = array('q')
+        self.codes = {column: array('I') for column in self.STRING_COLUMNS}
+        self.values = {column: [] for column in self.STRING_COLUMNS}
+        self.times = {column: array('d') for column in self.TIME_COLUMNS}
+        self.positions = {}
+        self.load_seconds = 0.0
+        self._encoders = {column: {} for column in self.STRING_COLUMNS}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, batch_size=5000):
+        """Build a snapshot from one column-projected, streamed query"""
+        started = time.perf_counter()
+        snapshot = cls(asset_change_version())
+        encoders = snapshot._encoders
+        columns = [Asset.id] + [getattr(Asset, column) for column in cls.STRING_COLUMNS + cls.TIME_COLUMNS]
+        statement = select(*columns).order_by(Asset.id).execution_options(yield_per=batch_size)
+
+        strings = [(snapshot.codes[column], snapshot.values[column], encoders[column])
+                   for column in cls.STRING_COLUMNS]
+        times = [snapshot.times[column] for column in cls.TIME_COLUMNS]
+        for row in db.session.execute(statement):
+            snapshot.positions[row[0]] = len(snapshot.ids)
+            snapshot.ids.append(row[0])
+            for (codes, values, encoder), value in zip(strings, row[1:]):
+                code = encoder.get(value)
+                if code is None:
+                    code = encoder[value] = len(values)
+                    values.append(value)
+                codes.append(code)
+            for target, value in zip(times, row[1 + len(strings):]):
+                target.append(_epoch(value))
+
+        snapshot.load_seconds = time.perf_counter() - started
+        return snapshot
+
+    def apply(self, updates):
+        """Fold fleet cache (record, previous) changes into the snapshot in place"""
+        with self._lock:
+            for record, previous in updates:
+                if previous is not None and (record is None or previous.id != record.id):
+                    self._remove(previous.id)
+                if record is None:
+                    continue
+                index = self.positions.get(record.id)
+                if index is None:
+                    index = self.positions[record.id] = len(self.ids)
+                    self.ids.append(record.id)
+                    for codes in self.codes.values():
+                        codes.append(0)
+                    for stamps in self.times.values():
+                        stamps.append(float('nan'))
+                for column in self.STRING_COLUMNS:
+                    self.codes[column][index] = self._encode(column, getattr(record, column))
+                for column in self.TIME_COLUMNS:
+                    self.times[column][index] = _epoch(getattr(record, column))
+                self.version = max(self.version, record.change_seq or 0)
+
+    def _encode(self, column, value):
+        encoder = self._encoders[column]
+        code = encoder.get(value)
+        if code is None:
+            code = encoder[value] = len(self.values[column])
+            self.values[column].append(value)
+        return code
+
+    def _remove(self, asset_pk):
+        index = self.positions.pop(asset_pk, None)
+        if index is None:
+            return
+        for column in (self.ids, *self.codes.values(), *self.times.values()):
+            last = column.pop()
+            if index < len(column):
+                column[index] = last
+        if index < len(self.ids):
+            self.positions[self.ids[index]] = index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        arrays = [self.ids, *self.codes.values(), *self.times.values()]
+        return sum(len(a) * a.itemsize for a in arrays)
+
+    def lookup(self, column):
+        """Return {asset id: value} for a string column"""
+        values = self.values[column]
+        with self._lock:
+            return dict(zip(self.ids, map(values.__getitem__, self.codes[column])))
+
+    def _matches(self, where):
+        """Yield indices whose string columns equal every value in where"""
+        wanted = []
+        for column, value in where.items():
+            try:
+                wanted.append((self.codes[column], self.values[column].index(value)))
+            except ValueError:
+                return
+        if not wanted:
+            yield from range(len(self.ids))
+            return
+        (first_codes, first_code), rest = wanted[0], wanted[1:]
+        for index, code in enumerate(first_codes):
+            if code == first_code and all(codes[index] == value for codes, value in rest):
+                yield index
+
+    def count_by(self, column, **where):
+        """Return {value: count} for a string column, optionally filtered by equality"""
+        codes, values = self.codes[column], self.values[column]
+        with self._lock:
+            if where:
+                counts = Counter(codes[index] for index in self._matches(where))
+            else:
+                counts = Counter(codes)
+        return {values[code]: count for code, count in counts.items()}
+
+    def older_than(self, column, cutoff, **where):
+        """Return asset ids whose timestamp column is set and earlier than cutoff (epoch seconds)"""
+        stamps = self.times[column]
+        # NaN compares False, so assets with no timestamp are skipped
+        with self._lock:
+            return [self.ids[index] for index in self._matches(where) if stamps[index] < cutoff]
+
+# Reporting windows for maintenance due dates, in days from now: (label, start, end)
+MAINTENANCE_WINDOWS = (
+    ('Overdue', None, 0),
+    ('This Week', 0, 7),
+    ('Next Week', 7, 14),
+    ('This Month', 14, 30),
+    ('Next Month', 30, 60),
+)
+DEFAULT_MAINTENANCE_INTERVAL = 90  # days, for categories missing from the Atlas
+
+class MaintenanceSchedule:
+    """Next maintenance due date for every asset, sorted for range queries.
+
+    An asset is due maintenance_interval days (from its Atlas category) after
+    its last MaintenanceRecord, or after purchase/registration if it has
+    never been serviced. Due dates are kept as a sorted list of epoch
+    seconds with a parallel array of asset ids, so "how many are due in
+    [a, b)" is two bisects and listing them is a slice. The index is rebuilt
+    when a maintenance record is added, or when assets changed since the
+    asset change sequence it was built at were added, removed or had their
+    category or purchase date edited; other asset changes only advance its
+    version. A rebuild swaps the whole index in with one assignment, and
+    readers take it once, so they never mix two builds.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._index = ([], array('q'), {})  # (due, asset_ids, due_by_asset)
+        self._inputs = {}  # asset pk -> (category, purchase_date) as of the last build
+        self.build_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def due(self):
+        return self._index[0]
+
+    @staticmethod
+    def current_version():
+        # Newest maintenance record and asset change sequence: primary-key lookups, no scans
+        return db.session.execute(select(
+            select(func.max(MaintenanceRecord.id)).scalar_subquery(),
+            select(ChangeCounter.value).where(ChangeCounter.name == 'asset').scalar_subquery()
+        )).one()
+
+    def refresh(self):
+        """Rebuild the index if maintenance records or any asset's due-date inputs changed"""
+        version = self.current_version()
+        if version == self.version:
+            return self
+        with self._lock:
+            if version != self.version:
+                if self.version is not None and version[0] == self.version[0] \
+                        and not self._assets_changed(self.version[1] or 0):
+                    self.version = version
+                else:
+                    self._build(version)
+        return self
+
+    def _assets_changed(self, since):
+        """Whether assets changed after change sequence since in a way that moves a due date"""
+        deleted = db.session.execute(
+            select(AssetTombstone.id).where(AssetTombstone.change_seq > since).limit(1)
+        ).first()
+        if deleted is not None:
+            return True
+        changed = db.session.execute(
+            select(Asset.id, Asset.category, Asset.purchase_date).where(Asset.change_seq > since)
+        )
+        return any(self._inputs.get(asset_pk) != (category, purchased) for asset_pk, category, purchased in changed)
+
+    def _build(self, version):
+        started = time.perf_counter()
+        last_service = select(
+            MaintenanceRecord.asset_id, func.max(MaintenanceRecord.performed_at).label('performed_at')
+        ).group_by(MaintenanceRecord.asset_id).subquery()
+        statement = select(
+            Asset.id, Asset.category, last_service.c.performed_at, Asset.purchase_date, Asset.created_at
+        ).outerjoin(last_service, last_service.c.asset_id == Asset.id).execution_options(yield_per=5000)
+
+        intervals = {category: info.get('maintenance_interval', DEFAULT_MAINTENANCE_INTERVAL) * 86400
+                     for category, info in ATLAS_OF_ASSETS.items()}
+        entries = []
+        inputs = {}
+        for asset_pk, category, serviced, purchased, created in db.session.execute(statement):
+            inputs[asset_pk] = (category, purchased)
+            base = serviced or purchased or created
+            if base is None:
+                continue
+            entries.append((_epoch(base) + intervals.get(category, DEFAULT_MAINTENANCE_INTERVAL * 86400), asset_pk))
+        entries.sort()
+
+        self._index = ([due for due, _ in entries], array('q', (asset_pk for _, asset_pk in entries)),
+                       {asset_pk: due for due, asset_pk in entries})
+        self._inputs = inputs
+        self.version = version
+        self.build_seconds = time.perf_counter() - started
+
+    @staticmethod
+    def _range(due, start_days, end_days, now):
+        low = 0 if start_days is None else bisect.bisect_left(due, now + start_days * 86400)
+        high = bisect.bisect_left(due, now + end_days * 86400)
+        return low, max(low, high)
+
+    def count_due(self, start_days, end_days, now=None):
+        """Number of assets due between start_days and end_days from now (None = any time before)"""
+        low, high = self._range(self._index[0], start_days, end_days, time.time() if now is None else now)
+        return high - low
+
+    def assets_due(self, start_days, end_days, now=None, limit=None):
+        """Asset ids due in the window, soonest first"""
+        due, asset_ids, _ = self._index
+        low, high = self._range(due, start_days, end_days, time.time() if now is None else now)
+        if limit is not None:
+            high = min(high, low + limit)
+        return list(asset_ids[low:high])
+
+    def windows(self, now=None):
+        now = time.time() if now is None else now
+        due = self._index[0]
+        counts = {}
+        for label, start, end in MAINTENANCE_WINDOWS:
+            low, high = self._range(due, start, end, now)
+            counts[label] = high - low
+        return counts
+
+    def next_due(self, asset_pk):
+        due = self._index[2].get(asset_pk)
+        return datetime.fromtimestamp(due, timezone.utc).replace(tzinfo=None) if due is not None else None
+
+maintenance_schedule = MaintenanceSchedule()
+
+_fleet_snapshot = None
+_fleet_snapshot_lock = threading.Lock()
+
+def fleet_snapshot():
+    """Return the fleet snapshot, loading it once; later asset changes arrive through the fleet cache"""
+    global _fleet_snapshot
+    # Warm the cache before the first load so no change falls between the two, and pull other workers' commits
+    fleet_cache.sync()
+    if _fleet_snapshot is None:
+        with _fleet_snapshot_lock:
+            if _fleet_snapshot is None:
+                _fleet_snapshot = FleetSnapshot.load()
+    return _fleet_snapshot
+
+def _update_fleet_snapshot(updates):
+    # Waits out a load in progress; changes the load already saw are simply rewritten
+    with _fleet_snapshot_lock:
+        if _fleet_snapshot is not None:
+            _fleet_snapshot.apply(updates)
+
+fleet_cache.add_listener(_update_fleet_snapshot)
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_fleet_changes(session, flush_context):
+    """Remember flushed asset states; they reach the fleet cache only if the transaction commits"""
+    pending = session.info.setdefault('fleet_changes', [])
+    for obj in session.new:
+        if isinstance(obj, Asset):
+            pending.append((AssetState.from_asset(obj), None))
+    for obj in session.dirty:
+        if isinstance(obj, Asset):
+            pending.append((AssetState.from_asset(obj), None))
+    for obj in session.deleted:
+        if isinstance(obj, Asset):
+            pending.append((None, (obj.asset_id, obj.id, obj.change_seq or 0)))
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_fleet_changes(session):
+    changes = session.info.pop('fleet_changes', None)
+    if changes:
+        fleet_cache.apply(changes)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_fleet_changes(session):
+    session.info.pop('fleet_changes', None)
+
+def asset_event(record, previous=None):
+    """Compact push message for an asset state; record None means previous was deleted"""
+    if record is None:
+        return {'seq': previous.change_seq, 'id': previous.id, 'asset_id': previous.asset_id, 'deleted': True,
+                'category': previous.category, 'location': previous.location}
+    message = {'seq': record.change_seq, 'id': record.id, 'asset_id': record.asset_id, 'status': record.status,
+               'location': record.location, 'category': record.category}
+    if previous is not None and previous.location != record.location:
+        message['previous_location'] = previous.location
+    return message
+
+class AssetSubscription:
+    """One SSE client: its filters and a bounded queue of encoded frames"""
+
+    def __init__(self, buffer_size, departments=None, categories=None, asset_ids=None):
+        self.departments = departments
+        self.categories = categories
+        self.asset_ids = asset_ids
+        self.frames = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.overflowed = False
+        self._ready = threading.Event()
+
+    def matches(self, message):
+        # Fields a message lacks (e.g. the location of a deleted asset we never cached) never filter it out
+        if self.asset_ids and message.get('asset_id') not in self.asset_ids:
+            return False
+        category = message.get('category')
+        if self.categories and category is not None and category not in self.categories:
+            return False
+        if self.departments:
+            locations = {message.get('location'), message.get('previous_location')} - {None}
+            if locations and not locations & self.departments:
+                return False
+        return True
+
+    def push(self, frame):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+            self.overflowed = True
+        self.frames.append(frame)
+        self._ready.set()
+
+    def drain(self, timeout):
+        """Wait up to timeout for frames; return (frames, overflowed since the last drain)"""
+        self._ready.wait(timeout)
+        self._ready.clear()
+        frames = []
+        while self.frames:
+            frames.append(self.frames.popleft())
+        overflowed, self.overflowed = self.overflowed, False
+        return frames, overflowed
+
+class AssetEventBroker:
+    """Fan asset state changes out to Server-Sent Events clients.
+
+    Fed by the fleet state cache, so it sees this process's commits as they
+    happen and other workers' commits within FLEET_CACHE_SYNC_SECONDS; while
+    anyone is subscribed a background thread keeps the cache syncing. Each
+    message is encoded once and pushed onto every matching client's bounded
+    queue. A slow client loses its oldest frames and is sent a resync event;
+    it never holds up writers or other clients.
+    """
+
+    def __init__(self, buffer_size, max_clients, poll_interval):
+        self.buffer_size = buffer_size
+        self.max_clients = max_clients
+        self.poll_interval = poll_interval
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {'published': 0, 'delivered': 0, 'dropped': 0, 'rejected': 0, 'peak_clients': 0,
+                      'sync_errors': 0}
+
+    def start(self, flask_app):
+        """Start the cache-sync thread once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                            name='asset-event-sync', daemon=True)
+            self._thread.start()
+
+    def _run(self, flask_app):
+        while True:
+            time.sleep(self.poll_interval)
+            if not self._subscribers:
+                continue
+            with flask_app.app_context():
+                try:
+                    fleet_cache.sync()
+                except Exception:
+                    db.session.rollback()
+                    self.stats['sync_errors'] += 1
+                    flask_app.logger.exception('Fleet cache sync for asset events failed')
+
+    def subscribe(self, **filters):
+        """Register a client, or return None when the process is at max_clients"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                self.stats['rejected'] += 1
+                return None
+            subscription = AssetSubscription(self.buffer_size, **filters)
+            self._subscribers.add(subscription)
+            self.stats['peak_clients'] = max(self.stats['peak_clients'], len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Release a client's slot; safe to call more than once"""
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+                self.stats['dropped'] += subscription.dropped
+
+    @staticmethod
+    def encode(message):
+        return f"id: {message['seq']}\nevent: asset\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+    def publish(self, updates):
+        """Fleet cache listener: push (record, previous) changes to matching subscribers"""
+        if not self._subscribers:
+            return
+        messages = [asset_event(record, previous) for record, previous in updates]
+        frames = [self.encode(message) for message in messages]
+        delivered = 0
+        with self._lock:
+            for subscription in self._subscribers:
+                for message, frame in zip(messages, frames):
+                    if subscription.matches(message):
+                        subscription.push(frame)
+                        delivered += 1
+            self.stats['published'] += len(messages)
+            self.stats['delivered'] += delivered
+
+    def replay(self, since, subscription):
+        """Frames for changes committed after change sequence since, or None if more than a buffer's worth"""
+        rows = db.session.execute(
+            select(*FLEET_STATE_COLUMNS).where(Asset.change_seq > since)
+            .order_by(Asset.change_seq).limit(self.buffer_size + 1)
+        ).all()
+        tombstones = db.session.execute(
+            select(AssetTombstone.change_seq, AssetTombstone.asset_pk, AssetTombstone.asset_id)
+            .where(AssetTombstone.change_seq > since).limit(self.buffer_size + 1)
+        ).all()
+        if len(rows) + len(tombstones) > self.buffer_size:
+            return None
+        messages = [asset_event(AssetState(*row)) for row in rows]
+        messages += [{'seq': seq, 'id': asset_pk, 'asset_id': asset_id, 'deleted': True}
+                     for seq, asset_pk, asset_id in tombstones]
+        messages.sort(key=lambda message: message['seq'])
+        return [self.encode(message) for message in messages if subscription.matches(message)]
+
+    def snapshot_stats(self):
+        with self._lock:
+            pending = sum(len(subscription.frames) for subscription in self._subscribers)
+            return dict(self.stats, clients=len(self._subscribers), buffered_frames=pending,
+                        buffer_size=self.buffer_size, max_clients=self.max_clients)
+
+asset_events = AssetEventBroker(app.config['SSE_CLIENT_BUFFER'], app.config['SSE_MAX_CLIENTS'],
+                                app.config['FLEET_CACHE_SYNC_SECONDS'])
+fleet_cache.add_listener(asset_events.publish)
+
+def fleet_event_row(asset_pk, asset_tag, event_type, now, status=None, location=None, usage_id=None):
+    return {'asset_id': asset_pk, 'asset_tag': asset_tag, 'event_type': event_type, 'occurred_at': now,
+            'source': request.endpoint if has_request_context() else 'background',
+            'status': status, 'location': location, 'usage_id': usage_id}
+
+def log_fleet_events(conn, rows):
+    """Insert fleet event rows, first taking the event counter row lock that checkpoints wait on.
+
+    The lock is held until commit, so a checkpoint never marks an event id
+    while a transaction holding a lower, still uncommitted id is open.
+    """
+    reserve_change_seqs(conn, 'fleet_event', len(rows))
+    bulk_insert(FleetEvent, rows)
+
+def _attribute_changed(obj, name):
+    return inspect(obj).attrs[name].history.has_changes()
+
+@event.listens_for(db.session, 'after_flush')
+def _log_fleet_events(session, flush_context):
+    """Write a FleetEvent for every flushed asset and usage state change, in the same transaction"""
+    now = datetime.utcnow()
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, Asset):
+            rows.append(fleet_event_row(obj.id, obj.asset_id, 'created', now, status=obj.status, location=obj.location))
+        elif isinstance(obj, AssetUsage) and obj.status in OPEN_USAGE_STATUSES:
+            rows.append(fleet_event_row(obj.asset_id, None, 'usage_started', now, usage_id=obj.id))
+    for obj in session.dirty:
+        if isinstance(obj, Asset):
+            changed = {name: getattr(obj, name) for name in ('status', 'location') if _attribute_changed(obj, name)}
+            if changed:
+                rows.append(fleet_event_row(obj.id, obj.asset_id, 'updated', now, **changed))
+        elif isinstance(obj, AssetUsage) and _attribute_changed(obj, 'status'):
+            if obj.status == 'overdue':
+                event_type = 'usage_overdue'
+            elif obj.status == 'active':
+                event_type = 'usage_started'
+            else:
+                event_type = 'usage_ended'
+            rows.append(fleet_event_row(obj.asset_id, None, event_type, now, usage_id=obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, Asset):
+            rows.append(fleet_event_row(obj.id, obj.asset_id, 'deleted', now))
+    if rows:
+        log_fleet_events(session.connection(), rows)
+
+class FleetHistory:
+    """Answer "what was the state of every asset at time T" from checkpoints and the event log.
+
+    A checkpoint maps asset pk -> [asset tag, status, location, open usage id,
+    usage status] as of an event id. The first is taken from the live tables;
+    later ones replay the log on top of the previous checkpoint, so they agree
+    with the log exactly. A query decodes the last checkpoint taken at or
+    before T (a couple are kept decoded in memory) and replays the events up
+    to T, which are bounded by the next checkpoint's event id.
+
+    Ids are handed out before commit, so a checkpoint first takes the event
+    counter lock (see log_fleet_events): every transaction with an event
+    below its mark has committed, and none can add one until it does.
+    Every worker starts the thread, but only the one holding lock_path
+    writes checkpoints.
+    """
+
+    POLL_SECONDS = 60
+
+    def __init__(self, max_events, max_seconds, lock_path, cache_size=2):
+        self.max_events = max_events
+        self.leader = LeaderLock(lock_path)
+        self.max_seconds = max_seconds
+        self.cache_size = cache_size
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {'leader': False, 'checkpoints': 0, 'last_checkpoint_at': None, 'last_checkpoint_seconds': None,
+                      'last_checkpoint_bytes': None, 'queries': 0, 'errors': 0}
+
+    def start(self, flask_app):
+        """Start the checkpoint thread once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                            name='fleet-checkpointer', daemon=True)
+            self._thread.start()
+
+    def _run(self, flask_app):
+        self.leader.acquire()
+        self.stats['leader'] = True
+        while True:
+            with flask_app.app_context():
+                try:
+                    self.maybe_checkpoint()
+                except Exception:
+                    db.session.rollback()
+                    self.stats['errors'] += 1
+                    flask_app.logger.exception('Fleet checkpoint failed')
+            time.sleep(self.POLL_SECONDS)
+
+    @staticmethod
+    def encode(states):
+        rows = [[asset_pk, *state] for asset_pk, state in sorted(states.items())]
+        return zlib.compress(json.dumps(rows, separators=(',', ':')).encode())
+
+    def decode(self, checkpoint):
+        states = self._decoded.get(checkpoint.id)
+        if states is None:
+            states = {row[0]: row[1:] for row in json.loads(zlib.decompress(checkpoint.payload))}
+            self._decoded[checkpoint.id] = states
+            while len(self._decoded) > self.cache_size:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(checkpoint.id)
+        return {asset_pk: list(state) for asset_pk, state in states.items()}
+
+    @staticmethod
+    def current_states():
+        """Fleet state straight from the asset and usage tables"""
+        states = {asset_pk: [asset_tag, status, location, None, None] for asset_pk, asset_tag, status, location
+                  in db.session.execute(select(Asset.id, Asset.asset_id, Asset.status, Asset.location))}
+        open_usages = db.session.execute(
+            select(AssetUsage.id, AssetUsage.asset_id, AssetUsage.status)
+            .where(AssetUsage.status.in_(OPEN_USAGE_STATUSES)).order_by(AssetUsage.id)
+        )
+        for usage_id, asset_pk, status in open_usages:
+            state = states.get(asset_pk)
+            if state is not None and state[3] is None:
+                state[3:] = [usage_id, status]
+        return states
+
+    @staticmethod
+    def replay(states, events):
+        """Apply (asset_id, asset_tag, event_type, status, location, usage_id) rows in log order"""
+        replayed = 0
+        for asset_pk, asset_tag, event_type, status, location, usage_id in events:
+            replayed += 1
+            if event_type == 'deleted':
+                states.pop(asset_pk, None)
+                continue
+            state = states.setdefault(asset_pk, [asset_tag, None, None, None, None])
+            if asset_tag is not None:
+                state[0] = asset_tag
+            if status is not None:
+                state[1] = status
+            if location is not None:
+                state[2] = location
+            if event_type == 'usage_started':
+                state[3:] = [usage_id, 'active']
+            elif event_type == 'usage_overdue':
+                state[3:] = [usage_id, 'overdue']
+            elif event_type == 'usage_ended' and state[3] == usage_id:
+                state[3:] = [None, None]
+        return replayed
+
+    @staticmethod
+    def _events(after_id, until_id=None, until_time=None):
+        query = select(FleetEvent.asset_id, FleetEvent.asset_tag, FleetEvent.event_type, FleetEvent.status,
+                       FleetEvent.location, FleetEvent.usage_id).where(FleetEvent.id > after_id)
+        if until_id is not None:
+            query = query.where(FleetEvent.id <= until_id)
+        if until_time is not None:
+            query = query.where(FleetEvent.occurred_at <= until_time)
+        return db.session.execute(query.order_by(FleetEvent.id).execution_options(yield_per=5000))
+
+    def checkpoint(self, now=None):
+        """Write a checkpoint as of the latest logged event"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            started = time.perf_counter()
+            reserve_change_seqs(db.session.connection(), 'fleet_event', 0)
+            last_event_id = db.session.execute(select(func.max(FleetEvent.id))).scalar() or 0
+            previous = FleetCheckpoint.query.order_by(FleetCheckpoint.last_event_id.desc()).first()
+            if previous is None:
+                states = self.current_states()
+            else:
+                states = self.decode(previous)
+                self.replay(states, self._events(previous.last_event_id, until_id=last_event_id))
+            payload = self.encode(states)
+            db.session.add(FleetCheckpoint(taken_at=now, last_event_id=last_event_id,
+                                           asset_count=len(states), payload=payload))
+            db.session.commit()
+            self.stats['checkpoints'] += 1
+            self.stats['last_checkpoint_at'] = now.isoformat()
+            self.stats['last_checkpoint_seconds'] = round(time.perf_counter() - started, 4)
+            self.stats['last_checkpoint_bytes'] = len(payload)
+        return last_event_id
+
+    def maybe_checkpoint(self, now=None):
+        """Checkpoint if none exists, max_events have been logged, or max_seconds passed with any events"""
+        now = now or datetime.utcnow()
+        latest = db.session.execute(
+            select(FleetCheckpoint.taken_at, FleetCheckpoint.last_event_id)
+            .order_by(FleetCheckpoint.last_event_id.desc()).limit(1)
+        ).first()
+        if latest is None:
+            return self.checkpoint(now)
+        pending = db.session.execute(
+            select(func.count()).select_from(
+                select(FleetEvent.id).where(FleetEvent.id > latest.last_event_id).limit(self.max_events).subquery()
+            )
+        ).scalar()
+        if pending >= self.max_events or (pending and (now - latest.taken_at).total_seconds() >= self.max_seconds):
+            return self.checkpoint(now)
+        return None
+
+    def state_at(self, when):
+        """Return (states, checkpoint, events replayed) for a moment; LookupError before the first checkpoint"""
+        checkpoint = FleetCheckpoint.query.filter(FleetCheckpoint.taken_at <= when) \
+            .order_by(FleetCheckpoint.taken_at.desc()).first()
+        if checkpoint is None:
+            raise LookupError('No fleet history before the first checkpoint')
+        # Events past the next checkpoint happened after it, so after when
+        next_event_id = db.session.execute(
+            select(FleetCheckpoint.last_event_id).where(FleetCheckpoint.taken_at > when)
+            .order_by(FleetCheckpoint.taken_at).limit(1)
+        ).scalar()
+        with self._lock:
+            states = self.decode(checkpoint)
+        replayed = self.replay(states, self._events(checkpoint.last_event_id, next_event_id, when))
+        self.stats['queries'] += 1
+        return states, checkpoint, replayed
+
+fleet_history = FleetHistory(app.config['FLEET_CHECKPOINT_EVENTS'], app.config['FLEET_CHECKPOINT_SECONDS'],
+                             os.path.join(app.instance_path, 'fleet_history.lock'))
+
+def _copy_rows(table, rows):
+    """Stream rows into a PostgreSQL table with COPY inside the session transaction"""
+    columns = [column for column in table.columns if not (column.primary_key and column.autoincrement)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = []
+        for column in columns:
+            if column.name in row:
+                value = row[column.name]
+            elif column.default is not None:
+                value = column.default.arg(None) if column.default.is_callable else column.default.arg
+            else:
+                value = None
+            values.append('\\N' if value is None else value)
+        writer.writerow(values)
+    buffer.seek(0)
+
+    preparer = db.engine.dialect.identifier_preparer
+    column_list = ', '.join(preparer.format_column(column) for column in columns)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {preparer.format_table(table)} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def bulk_insert(model, rows):
+    """Insert plain-dict rows in bulk as part of the current transaction.
+
+    Large batches on PostgreSQL with psycopg2 are streamed through COPY;
+    everything else goes through a single executemany INSERT.
+    """
+    if not rows:
+        return 0
+    dialect = db.engine.dialect
+    if (dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+            and len(rows) >= app.config['BULK_COPY_THRESHOLD']):
+        _copy_rows(model.__table__, rows)
+    else:
+        db.session.execute(model.__table__.insert(), rows)
+    return len(rows)
+
+def upsert_insert(table):
+    """INSERT for table that supports on_conflict_do_update on the app's database"""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql_insert(table)
+    return sqlite_insert(table)
+
+def alert_fingerprint(asset_pk, alert_type):
+    """Identify an incident: open alerts of one type on one asset are the same alert"""
+    return f'{alert_type}:{asset_pk}'
+
+def alert_row(asset_pk, alert_type, message, severity, now):
+    """A new open Alert as a plain dict for bulk_insert"""
+    return {
+        'asset_id': asset_pk,
+        'alert_type': alert_type,
+        'message': message,
+        'severity': severity,
+        'is_resolved': False,
+        'created_at': now,
+        'last_seen': now,
+        'occurrences': 1,
+        'fingerprint': alert_fingerprint(asset_pk, alert_type)
+    }
+
+def raise_alerts(alerts, now=None):
+    """Record alerts in the current transaction, folding repeats into open ones.
+
+    Each alert is a dict with asset_id, alert_type, message and severity. If
+    an open alert with the same fingerprint exists, its occurrences and
+    last_seen are bumped and it takes the newer message and severity;
+    otherwise a row is inserted. Returns (inserted, updated) as seen by a
+    lookup just before the write; the write itself is an upsert against
+    ux_alert_open_fingerprint, so a concurrent insert folds rather than
+    duplicating.
+    """
+    if not alerts:
+        return 0, 0
+    now = now or datetime.utcnow()
+
+    incoming = {}
+    for alert in alerts:
+        fingerprint = alert_fingerprint(alert['asset_id'], alert['alert_type'])
+        row = incoming.get(fingerprint)
+        if row is None:
+            incoming[fingerprint] = alert_row(alert['asset_id'], alert['alert_type'],
+                                              alert['message'], alert['severity'], now)
+        else:
+            row.update(message=alert['message'], severity=alert['severity'])
+            row['occurrences'] += 1
+
+    open_alerts = {}
+    for chunk in _chunked(list(incoming)):
+        open_alerts.update(db.session.execute(
+            select(Alert.fingerprint, Alert.id).where(Alert.fingerprint.in_(chunk), Alert.is_resolved.is_(False))
+        ).all())
+
+    upsert_alert_rows(list(incoming.values()))
+    updated = sum(1 for fingerprint in incoming if fingerprint in open_alerts)
+    return len(incoming) - updated, updated
+
+def upsert_alert_rows(rows):
+    """Insert alert_row dicts, folding each into the open alert with its fingerprint if there is one"""
+    if not rows:
+        return
+    table = Alert.__table__
+    statement = upsert_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.fingerprint],
+        index_where=OPEN_ALERT,
+        set_={
+            'occurrences': func.coalesce(table.c.occurrences, 1) + statement.excluded.occurrences,
+            'last_seen': statement.excluded.last_seen,
+            'message': statement.excluded.message,
+            'severity': statement.excluded.severity
+        }
+    )
+    db.session.execute(statement, rows)
+
+def _hour_buckets(start, end):
+    """Yield (bucket_start, seconds) for each hour an interval overlaps"""
+    bucket = start.replace(minute=0, second=0, microsecond=0)
+    while bucket < end:
+        next_bucket = bucket + timedelta(hours=1)
+        yield bucket, (min(end, next_bucket) - max(start, bucket)).total_seconds()
+        bucket = next_bucket
+
+def _fold_usage(totals, department, category, start_time, end_time, status):
+    """Add one usage to a {(department, category, bucket): [started, completed, seconds]} map"""
+    department = department or 'Unknown'
+    start_bucket = start_time.replace(minute=0, second=0, microsecond=0)
+    totals.setdefault((department, category, start_bucket), [0, 0, 0.0])[0] += 1
+    if end_time and status == 'completed':
+        end_bucket = end_time.replace(minute=0, second=0, microsecond=0)
+        totals.setdefault((department, category, end_bucket), [0, 0, 0.0])[1] += 1
+        for bucket, seconds in _hour_buckets(start_time, end_time):
+            totals.setdefault((department, category, bucket), [0, 0, 0.0])[2] += seconds
+
+def rebuild_usage_rollups(conn):
+    """Recompute the usage rollup table from the full usage history"""
+    usage, asset = AssetUsage.__table__, Asset.__table__
+    query = select(usage.c.department, asset.c.category, usage.c.start_time, usage.c.end_time, usage.c.status) \
+        .join(asset, asset.c.id == usage.c.asset_id) \
+        .where(usage.c.start_time.isnot(None))
+
+    totals = {}
+    for row in conn.execution_options(yield_per=10000).execute(query):
+        _fold_usage(totals, *row)
+
+    conn.execute(UsageRollup.__table__.delete())
+    rows = [{'department': department, 'category': category, 'bucket_start': bucket,
+             'usages_started': started, 'usages_completed': completed, 'busy_seconds': seconds}
+            for (department, category, bucket), (started, completed, seconds) in totals.items()]
+    for chunk in _chunked(rows, 5000):
+        conn.execute(UsageRollup.__table__.insert(), chunk)
+
+def _merge_rollup(model, key_columns, value_columns, rows):
+    """Add row values onto existing rollup rows with the same key, inserting the rest.
+
+    One INSERT ... ON CONFLICT DO UPDATE against the key's unique constraint,
+    so workers merging overlapping keys at once add up instead of failing.
+    Rows go in key order so concurrent merges lock rows in the same order.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    statement = upsert_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_columns],
+        set_={name: table.c[name] + statement.excluded[name] for name in value_columns}
+    )
+    db.session.execute(statement, sorted(rows, key=lambda row: tuple(row[name] for name in key_columns)))
+
+def record_usage_started(usage, asset):
+    """Count a new usage in its start-hour rollup bucket when the session commits"""
+    department = usage.department or 'Unknown'
+    bucket = usage.start_time.replace(minute=0, second=0, microsecond=0)
+    db.session.info.setdefault('usage_rollup', {}).setdefault((department, asset.category, bucket), [0, 0, 0.0])[0] += 1
+
+def record_usage_ended(usage, asset):
+    """Spread a finished usage's busy time over the hour buckets it covered when the session commits"""
+    totals = db.session.info.setdefault('usage_rollup', {})
+    _fold_usage(totals, usage.department, asset.category, usage.start_time, usage.end_time, 'completed')
+    # The start was already counted by record_usage_started
+    start_key = (usage.department or 'Unknown', asset.category,
+                 usage.start_time.replace(minute=0, second=0, microsecond=0))
+    totals[start_key][0] -= 1
+
+@event.listens_for(db.session, 'before_commit')
+def _write_usage_rollups(session):
+    """Add the transaction's rollup deltas with one upsert, safe against other workers doing the same"""
+    totals = session.info.pop('usage_rollup', None)
+    if totals:
+        rows = [{'department': department, 'category': category, 'bucket_start': bucket,
+                 'usages_started': started, 'usages_completed': completed, 'busy_seconds': seconds}
+                for (department, category, bucket), (started, completed, seconds) in totals.items()]
+        _merge_rollup(UsageRollup, ('department', 'category', 'bucket_start'),
+                      ('usages_started', 'usages_completed', 'busy_seconds'), rows)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_usage_rollups(session):
+    session.info.pop('usage_rollup', None)
+
+def _from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+def _epoch_sql(column):
+    """SQL expression for a naive-UTC DateTime column as epoch seconds"""
+    if db.engine.dialect.name == 'sqlite':
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    # EXTRACT returns numeric from PostgreSQL 14, which psycopg2 reads as Decimal
+    return cast(func.extract('epoch', column), db.Float)
+
+def _peak_concurrency(starts, ends):
+    """Most [start, end) intervals open at once, and when that was first reached.
+
+    After sorting both sides, the number open just after the i-th start is
+    i + 1 minus the ends at or before it (an interval ending exactly when
+    another starts does not overlap it). The map/bisect pipeline keeps the
+    sweep in C rather than a Python loop.
+    """
+    if not starts:
+        return 0, None
+    starts = sorted(starts)
+    ends = sorted(ends)
+    open_counts = list(map(operator.sub, range(1, len(starts) + 1),
+                           map(bisect.bisect_right, itertools.repeat(ends), starts)))
+    peak = max(open_counts)
+    return peak, starts[open_counts.index(peak)]
+
+class UtilizationReport:
+    """Busy-time fractions, concurrency peaks and idle gaps for one window.
+
+    Built by a single sort-and-sweep over the usage intervals that overlap
+    the window, clipped to it. Per asset, overlapping usages are merged
+    before summing so double-logged usages are not counted twice; the gaps
+    between merged intervals (and the window edges) are its idle gaps.
+    Category utilization divides busy asset-time by the category's current
+    asset count times the window length; department figures are average
+    and peak numbers of assets in use, since departments do not own assets.
+    """
+
+    def __init__(self, window_start, window_end, now=None):
+        self.window_start = window_start
+        self.window_end = window_end
+        self.now = now or datetime.utcnow()
+        self.window_seconds = (window_end - window_start).total_seconds()
+        self.intervals = 0
+        self.assets = {}
+        self.categories = {}
+        self.departments = {}
+        self.utilization = 0.0
+        self.compute_seconds = None
+
+    def build(self):
+        started = time.perf_counter()
+        lo, hi = _epoch(self.window_start), _epoch(self.window_end)
+        open_end = _epoch(min(self.now, self.window_end))
+
+        # Epoch seconds are computed in SQL; parsing a million DateTimes in Python costs more than the sweep.
+        # No ORDER BY or join: an index-ordered scan of asset_usage is random table access, and the
+        # category of each asset comes from the in-memory fleet snapshot instead.
+        usage = AssetUsage.__table__
+        query = select(usage.c.asset_id, usage.c.department,
+                       _epoch_sql(usage.c.start_time), func.coalesce(_epoch_sql(usage.c.end_time), open_end)) \
+            .where(usage.c.start_time < self.window_end,
+                   or_(usage.c.end_time.is_(None), usage.c.end_time > self.window_start))
+
+        asset_spans = {}
+        department_spans = {}
+        for asset_pk, department, start, end in \
+                db.session.connection().execute(query.execution_options(yield_per=20000)):
+            if start < lo:
+                start = lo
+            if end > hi:
+                end = hi
+            if end <= start:
+                continue
+            spans = asset_spans.get(asset_pk)
+            if spans is None:
+                spans = asset_spans[asset_pk] = []
+            spans.append((start, end))
+            spans = department_spans.get(department)
+            if spans is None:
+                spans = department_spans[department] = (array('d'), array('d'))
+            spans[0].append(start)
+            spans[1].append(end)
+
+        snapshot = fleet_snapshot()
+        asset_category = snapshot.lookup('category')
+        category_spans = {}
+        category_busy = Counter()
+        category_used = Counter()
+        for asset_pk, spans in asset_spans.items():
+            self.intervals += len(spans)
+            spans.sort()
+            # Union in start order: only time past what is already covered counts as busy
+            busy = longest_gap = 0.0
+            gaps = 0
+            covered = lo
+            for start, end in spans:
+                if start > covered:
+                    gaps += 1
+                    longest_gap = max(longest_gap, start - covered)
+                    busy += end - start
+                    covered = end
+                elif end > covered:
+                    busy += end - covered
+                    covered = end
+            if hi > covered:
+                gaps += 1
+                longest_gap = max(longest_gap, hi - covered)
+
+            category = asset_category.get(asset_pk, 'Unknown')
+            self.assets[asset_pk] = {
+                'category': category,
+                'busy_hours': round(busy / 3600, 2),
+                'utilization': round(busy / self.window_seconds * 100, 2),
+                'idle_gaps': gaps,
+                'longest_idle_hours': round(longest_gap / 3600, 2)
+            }
+            category_busy[category] += busy
+            category_used[category] += 1
+            starts_ends = category_spans.get(category)
+            if starts_ends is None:
+                starts_ends = category_spans[category] = (array('d'), array('d'))
+            starts_ends[0].extend(map(operator.itemgetter(0), spans))
+            starts_ends[1].extend(map(operator.itemgetter(1), spans))
+
+        fleet_counts = snapshot.count_by('category')
+        for category in set(fleet_counts) | set(category_spans):
+            count = fleet_counts.get(category, 0)
+            peak, peak_at = _peak_concurrency(*category_spans.get(category, ((), ())))
+            busy = category_busy.get(category, 0.0)
+            self.categories[category] = {
+                'assets': count,
+                'assets_used': category_used.get(category, 0),
+                'busy_hours': round(busy / 3600, 1),
+                'utilization': round(busy / (count * self.window_seconds) * 100, 2) if count else 0.0,
+                'peak_concurrent': peak,
+                'peak_at': _from_epoch(peak_at).isoformat() if peak_at is not None else None
+            }
+        for department, (starts, ends) in department_spans.items():
+            peak, peak_at = _peak_concurrency(starts, ends)
+            busy = sum(ends) - sum(starts)
+            self.departments[department or 'Unknown'] = {
+                'busy_hours': round(busy / 3600, 1),
+                'avg_concurrent': round(busy / self.window_seconds, 2),
+                'peak_concurrent': peak,
+                'peak_at': _from_epoch(peak_at).isoformat()
+            }
+
+        total_assets = sum(fleet_counts.values())
+        if total_assets:
+            self.utilization = round(sum(category_busy.values()) / (total_assets * self.window_seconds) * 100, 2)
+        self.compute_seconds = time.perf_counter() - started
+        return self
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+class UtilizationEngine:
+    """Cache of UtilizationReports keyed by window, each kept for ttl seconds"""
+
+    def __init__(self, ttl, max_reports=8):
+        self.ttl = ttl
+        self.max_reports = max_reports
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+
+    def report(self, window_start, window_end):
+        key = (window_start, window_end)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._reports.get(key)
+            if cached is not None and cached[0] > now:
+                self._reports.move_to_end(key)
+                return cached[1]
+        report = UtilizationReport(window_start, window_end).build()
+        with self._lock:
+            self._reports[key] = (now + self.ttl, report)
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+        return report
+
+utilization_engine = UtilizationEngine(app.config['UTILIZATION_CACHE_SECONDS'])
 
 # Atlas of Assets - Knowledge Layer
 ATLAS_OF_ASSETS = {
@@ -101,7 +1917,8 @@ ATLAS_OF_ASSETS = {
         'training_required': True,
         'critical_device': False,
         'max_continuous_use': 6,
-        'maintenance_interval': 60
+        'maintenance_interval': 60,
+        'allowed_zones': ['Radiology', 'ICU', 'ER', 'OR', 'Storage', 'Biomed']  # RFID reads elsewhere raise location_mismatch
     },
     'portable_ultrasound': {
         'sop': 'Calibrate transducer. Verify image quality. Check battery. Clean probe after use.',
@@ -157,154 +1974,2045 @@ ATLAS_OF_ASSETS = {
         'training_required': True,
         'critical_device': True,
         'max_continuous_use': 4,
-        'maintenance_interval': 15
+        'maintenance_interval': 15,
+        'allowed_zones': ['ICU', 'ER', 'OR', 'Storage', 'Biomed']
     },
     'anesthesia_cart': {
         'sop': 'Check medication inventory. Verify equipment functionality. Ensure sterile conditions. Monitor patient vitals.',
         'training_required': True,
         'critical_device': True,
         'max_continuous_use': 6,
-        'maintenance_interval': 7
+        'maintenance_interval': 7,
+        'allowed_zones': ['OR', 'Storage', 'Biomed']
     }
 }
 
-def generate_qr_code(asset_id):
-    """Generate QR code for asset"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(f"asset:{asset_id}")
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert to base64
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    return f"data:image/png;base64,{img_str}"
+def render_qr_png(asset_id):
+    """Render the QR code for an asset as PNG bytes"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(f"asset:{asset_id}")
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class QRImageCache:
+    """Bounded LRU of rendered QR PNGs with an optional content-addressed disk tier.
+
+    Images are keyed by the SHA-256 of their payload, which doubles as a
+    strong ETag: the same asset ID always renders the same bytes.
+    """
+
+    def __init__(self, max_entries, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(asset_id):
+        return hashlib.sha256(f"qr-v1:asset:{asset_id}".encode()).hexdigest()
+
+    def get(self, asset_id):
+        """Return (etag, png) from memory or disk, or None when not cached"""
+        digest = self.digest(asset_id)
+        with self._lock:
+            png = self._images.get(digest)
+            if png is not None:
+                self._images.move_to_end(digest)
+                self.hits += 1
+                return digest, png
+
+        if self.disk_dir:
+            try:
+                with open(os.path.join(self.disk_dir, digest[:2], digest + '.png'), 'rb') as f:
+                    png = f.read()
+            except OSError:
+                png = None
+            if png is not None:
+                self._remember(digest, png)
+                self.hits += 1
+                return digest, png
+
+        self.misses += 1
+        return None
+
+    def discard(self, asset_id):
+        """Forget an asset's image in memory and on disk"""
+        digest = self.digest(asset_id)
+        with self._lock:
+            self._images.pop(digest, None)
+        if self.disk_dir:
+            try:
+                os.remove(os.path.join(self.disk_dir, digest[:2], digest + '.png'))
+            except OSError:
+                pass
+
+    def put(self, asset_id, png):
+        digest = self.digest(asset_id)
+        self._remember(digest, png)
+        if self.disk_dir:
+            folder = os.path.join(self.disk_dir, digest[:2])
+            os.makedirs(folder, exist_ok=True)
+            tmp_path = os.path.join(folder, f'{digest}.{os.getpid()}.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, os.path.join(folder, digest + '.png'))
+        return digest
+
+    def _remember(self, digest, png):
+        with self._lock:
+            self._images[digest] = png
+            self._images.move_to_end(digest)
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+
+qr_cache = QRImageCache(app.config['QR_CACHE_SIZE'], app.config['QR_DISK_CACHE_DIR'])
+
+def _discard_deleted_qr_codes(updates):
+    """Fleet cache listener: drop cached QR images of deleted assets"""
+    for record, previous in updates:
+        if record is None:
+            qr_cache.discard(previous.asset_id)
+
+fleet_cache.add_listener(_discard_deleted_qr_codes)
+
+# Printable label sheets: US Letter at 200 DPI, 2 x 8 labels per page
+LABEL_SHEET_SIZE = (1700, 2200)
+LABEL_GRID = (2, 8)
+LABEL_MARGIN = (100, 100)
+
+_label_pool = None
+_label_pool_lock = threading.Lock()
+
+def render_labels(labels):
+    """Render (asset_id, name) pairs in order, spreading large jobs over a process pool"""
+    global _label_pool
+    workers = app.config['LABEL_WORKERS']
+    if workers <= 1 or len(labels) < 32:
+        return [render_label(asset_id, name) for asset_id, name in labels]
+
+    with _label_pool_lock:
+        if _label_pool is None:
+            # spawn keeps worker startup safe alongside the RFID writer thread; workers
+            # import only label_render, never this module and its background services
+            _label_pool = ProcessPoolExecutor(max_workers=workers,
+                                              mp_context=multiprocessing.get_context('spawn'))
+    chunksize = max(1, len(labels) // (workers * 4))
+    return list(_label_pool.map(render_label_args, labels, chunksize=chunksize))
+
+def compose_label_sheets(tiles):
+    """Lay rendered label tiles out on printable pages"""
+    columns, rows = LABEL_GRID
+    cell_width = (LABEL_SHEET_SIZE[0] - 2 * LABEL_MARGIN[0]) // columns
+    cell_height = (LABEL_SHEET_SIZE[1] - 2 * LABEL_MARGIN[1]) // rows
+    per_sheet = columns * rows
+
+    sheets = []
+    for start in range(0, len(tiles), per_sheet):
+        sheet = Image.new('L', LABEL_SHEET_SIZE, 255)
+        for position, pixels in enumerate(tiles[start:start + per_sheet]):
+            column, row = position % columns, position // columns
+            sheet.paste(Image.frombytes('L', LABEL_SIZE, pixels),
+                        (LABEL_MARGIN[0] + column * cell_width, LABEL_MARGIN[1] + row * cell_height))
+        sheets.append(sheet)
+    return sheets
+
+LABEL_SHEETS_PER_CHUNK = 8  # sheets rendered per step of a streamed label job
+
+def label_sheets(labels):
+    """Yield composed sheets for (asset_id, name) pairs, rendering a few sheets at a time"""
+    per_chunk = LABEL_GRID[0] * LABEL_GRID[1] * LABEL_SHEETS_PER_CHUNK
+    for start in range(0, len(labels), per_chunk):
+        yield from compose_label_sheets(render_labels(labels[start:start + per_chunk]))
+
+def stream_label_pdf(sheets, dpi=200):
+    """Yield a PDF of the sheets as it is built, one Flate-compressed 1-bit page image each.
+
+    Objects are numbered up front (page, contents, image per sheet) so each
+    page can be sent as soon as it is encoded; the page tree and the xref
+    table, which need every offset, come last.
+    """
+    width, height = LABEL_SHEET_SIZE
+    box = (width * 72 / dpi, height * 72 / dpi)
+    offsets = {}
+    written = 0
+
+    def pdf_object(number, body):
+        nonlocal written
+        offsets[number] = written
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        written += len(data)
+        return data
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    written = len(header)
+    yield header
+    yield pdf_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+    pages = []
+    number = 3
+    content = b'q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q' % box
+    for sheet in sheets:
+        page, contents, image = number, number + 1, number + 2
+        number += 3
+        pages.append(page)
+        # Mode '1' packs rows MSB first with 1 = white, which is DeviceGray at one bit per component
+        pixels = zlib.compress(sheet.convert('1').tobytes())
+        yield pdf_object(page, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+                               b'/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>'
+                         % (*box, image, contents))
+        yield pdf_object(contents, b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+        yield pdf_object(image, b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray '
+                                b'/BitsPerComponent 1 /Filter /FlateDecode /Length %d >>\nstream\n'
+                         % (width, height, len(pixels)) + pixels + b'\nendstream')
+
+    kids = b' '.join(b'%d 0 R' % page for page in pages)
+    yield pdf_object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(pages)))
+    xref = [b'xref\n0 %d\n0000000000 65535 f \n' % number]
+    xref.extend(b'%010d 00000 n \n' % offsets[object_number] for object_number in range(1, number))
+    yield b''.join(xref) + b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (number, written)
+
+class _StreamSink:
+    """Write-only file object that hands back whatever was written since the last drain()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_label_zip(sheets):
+    """Yield a ZIP of one PNG per sheet as it is built.
+
+    zipfile writes to an unseekable sink with data descriptors, so each
+    entry is sent as soon as it is stored and only the central directory waits for the end.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for number, sheet in enumerate(sheets, start=1):
+            page = io.BytesIO()
+            sheet.save(page, format='PNG', dpi=(200, 200))
+            archive.writestr(f'asset_labels_{number:03d}.png', page.getvalue())
+            yield sink.drain()
+    yield sink.drain()
+
+# Idle-asset alert rules: (alert_type, idle days that must be exceeded, rentals only, severity)
+ALERT_RULES = (
+    ('rental_expiry', 7, True, 'high'),
+    ('inactivity', 30, False, 'medium'),
+)
+ALERT_MESSAGES = {
+    'rental_expiry': 'Rental asset {name} has not been used for {days} days',
+    'inactivity': 'Asset {name} has been inactive for {days} days',
+}
+
+class AlertSweeper:
+    """Raise idle-asset alerts across the fleet from a background thread.
+
+    A rule fires once an asset's last_usage is more than its threshold in
+    the past. Each sweep reads only assets whose last_usage crossed a
+    threshold since the previous sweep (a range scan on ix_asset_last_usage),
+    so steady-state sweeps touch a handful of rows; the first sweep in a
+    process covers everything already past the threshold. Assets that
+    already have an open alert of the same type are filtered out in SQL, and
+    new alerts are written with a single bulk insert. Every worker starts the
+    thread, but only the one holding lock_path sweeps.
+    """
+
+    def __init__(self, interval, lock_path):
+        self.interval = interval
+        self.leader = LeaderLock(lock_path)
+        self._last_sweep = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {'leader': False, 'sweeps': 0, 'alerts_raised': 0, 'last_sweep_at': None, 'last_duration_seconds': None,
+                      'max_duration_seconds': 0.0, 'last_raised': 0, 'errors': 0}
+
+    def start(self, flask_app):
+        """Start the sweeper thread once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                            name='alert-sweeper', daemon=True)
+            self._thread.start()
+
+    def _run(self, flask_app):
+        self.leader.acquire()
+        self.stats['leader'] = True
+        while True:
+            with flask_app.app_context():
+                try:
+                    self.sweep()
+                except Exception:
+                    db.session.rollback()
+                    self.stats['errors'] += 1
+                    flask_app.logger.exception('Alert sweep failed')
+            time.sleep(self.interval)
+
+    def sweep(self, now=None):
+        """Evaluate ALERT_RULES against assets that crossed a threshold and insert new alerts"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            started = time.perf_counter()
+            previous = self._last_sweep
+            rows = []
+            for alert_type, days, rentals_only, severity in ALERT_RULES:
+                threshold = timedelta(days=days + 1)
+                query = select(Asset.id, Asset.name, Asset.last_usage).where(Asset.last_usage <= now - threshold)
+                if previous is not None:
+                    query = query.where(Asset.last_usage > previous - threshold)
+                if rentals_only:
+                    query = query.where(Asset.ownership == 'rental')
+                # De-duplicate in the database so assets with an open alert are never loaded
+                open_alert = select(Alert.id).where(Alert.alert_type == alert_type,
+                                                    Alert.asset_id == Asset.id,
+                                                    Alert.is_resolved.is_(False))
+                crossed = db.session.execute(query.where(~open_alert.exists())).all()
+
+                # Already filtered against open alerts, so these skip the raise_alerts lookup
+                template = ALERT_MESSAGES[alert_type]
+                rows.extend(alert_row(asset_pk, alert_type, template.format(name=name, days=(now - last_usage).days),
+                                      severity, now)
+                            for asset_pk, name, last_usage in crossed)
+
+            upsert_alert_rows(rows)
+            db.session.commit()
+            self._last_sweep = now
+
+            duration = time.perf_counter() - started
+            self.stats['sweeps'] += 1
+            self.stats['alerts_raised'] += len(rows)
+            self.stats['last_sweep_at'] = now.isoformat()
+            self.stats['last_duration_seconds'] = round(duration, 4)
+            self.stats['max_duration_seconds'] = round(max(self.stats['max_duration_seconds'], duration), 4)
+            self.stats['last_raised'] = len(rows)
+            return len(rows)
+
+alert_sweeper = AlertSweeper(app.config['ALERT_SWEEP_SECONDS'], os.path.join(app.instance_path, 'alert_sweeper.lock'))
+
+# Usages that have not ended yet; overdue ones can still be ended by staff or an RFID exit
+OPEN_USAGE_STATUSES = ('active', 'overdue')
+
+def usage_deadline(start_time, expected_duration, category):
+    """When a usage becomes overdue: its expected duration, else the Atlas continuous-use limit"""
+    hours = expected_duration or ATLAS_OF_ASSETS.get(category, {}).get('max_continuous_use', 8)
+    return start_time + timedelta(hours=hours)
+
+class OverdueScheduler:
+    """Flip usages to overdue and raise an alert the moment their deadline passes.
+
+    Deadlines live in a min-heap owned by one thread, which sleeps until the
+    earliest one. New usages reach it through an inbox filled after commit
+    (see the session hooks below); ended usages are not removed from the
+    heap but are skipped when they pop, because the overdue UPDATE only
+    matches rows that are still active. On start the heap is rebuilt from
+    the active usages alone, via ix_asset_usage_status.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._inbox = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self.stats = {'scheduled': 0, 'marked_overdue': 0, 'skipped': 0, 'rebuilt': 0, 'errors': 0}
+
+    def start(self, flask_app):
+        """Rebuild the heap and start the scheduler thread once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                            name='overdue-scheduler', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, usages):
+        """Hand (usage_id, asset_pk, start_time, expected_duration) tuples to the scheduler"""
+        with self._lock:
+            self._inbox.extend(usages)
+            self._wakeup.notify()
+
+    def rebuild(self):
+        """Load deadlines for every active usage"""
+        rows = db.session.execute(
+            select(AssetUsage.id, AssetUsage.start_time, AssetUsage.expected_duration, Asset.category)
+            .join(Asset, Asset.id == AssetUsage.asset_id)
+            .where(AssetUsage.status == 'active')
+        ).all()
+        heap = [(usage_deadline(start, duration, category), usage_id) for usage_id, start, duration, category in rows]
+        heapq.heapify(heap)
+        self._heap = heap
+        self.stats['rebuilt'] = len(heap)
+
+    def schedule_pending(self):
+        """Move inbox entries onto the heap, looking up categories where the Atlas limit applies"""
+        with self._lock:
+            inbox, self._inbox = self._inbox, []
+        try:
+            needs_category = list({asset_pk for _, asset_pk, _, duration in inbox if not duration})
+            categories = {}
+            for chunk in _chunked(needs_category):
+                categories.update(db.session.execute(
+                    select(Asset.id, Asset.category).where(Asset.id.in_(chunk))
+                ).all())
+        except Exception:
+            with self._lock:
+                self._inbox[:0] = inbox
+            raise
+        for usage_id, asset_pk, start_time, duration in inbox:
+            heapq.heappush(self._heap, (usage_deadline(start_time, duration, categories.get(asset_pk)), usage_id))
+        self.stats['scheduled'] += len(inbox)
+
+    def fire_due(self, now=None):
+        """Mark every usage whose deadline has passed overdue; return how many were"""
+        now = now or datetime.utcnow()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        if not due:
+            return 0
+
+        marked = 0
+        alerts = []
+        events = []
+        usages = AssetUsage.__table__
+        for deadline, usage_id in due:
+            # Only still-active rows match, so ended usages and other workers' claims are skipped
+            result = db.session.execute(
+                usages.update().where(usages.c.id == usage_id, usages.c.status == 'active')
+                .values(status='overdue')
+            )
+            if result.rowcount != 1:
+                self.stats['skipped'] += 1
+                continue
+            usage = db.session.get(AssetUsage, usage_id)
+            asset = db.session.get(Asset, usage.asset_id)
+            hours = (deadline - usage.start_time).total_seconds() / 3600
+            # The core UPDATE above bypasses the flush hook that logs fleet events
+            events.append(fleet_event_row(asset.id, asset.asset_id, 'usage_overdue', now, usage_id=usage_id))
+            alerts.append({
+                'asset_id': asset.id,
+                'alert_type': 'overuse',
+                'message': f'Asset {asset.name} is overdue: in use for more than {hours:g} hours',
+                'severity': 'high'
+            })
+            marked += 1
+        raise_alerts(alerts)
+        if events:
+            log_fleet_events(db.session.connection(), events)
+        db.session.commit()
+        self.stats['marked_overdue'] += marked
+        return marked
+
+    def next_deadline(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pending(self):
+        return len(self._heap)
+
+    def _run(self, flask_app):
+        rebuilt = False
+        while True:
+            with self._lock:
+                while not self._inbox and rebuilt:
+                    deadline = self.next_deadline()
+                    timeout = None if deadline is None else (deadline - datetime.utcnow()).total_seconds()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._wakeup.wait(timeout)
+            with flask_app.app_context():
+                try:
+                    if not rebuilt:
+                        self.rebuild()
+                        rebuilt = True
+                    self.schedule_pending()
+                    self.fire_due()
+                except Exception:
+                    db.session.rollback()
+                    self.stats['errors'] += 1
+                    flask_app.logger.exception('Overdue scheduler failed, retrying')
+                    time.sleep(1)
+
+overdue_scheduler = OverdueScheduler()
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_new_usages(session, flush_context):
+    pending = session.info.setdefault('new_usages', [])
+    for obj in session.new:
+        if isinstance(obj, AssetUsage) and obj.status == 'active':
+            pending.append((obj.id, obj.asset_id, obj.start_time, obj.expected_duration))
+
+@event.listens_for(db.session, 'after_commit')
+def _schedule_new_usages(session):
+    usages = session.info.pop('new_usages', None)
+    if usages and app.config['OVERDUE_SCHEDULER_ENABLED']:
+        overdue_scheduler.enqueue(usages)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_new_usages(session):
+    session.info.pop('new_usages', None)
+
+@app.before_request
+def _start_query_count():
+    if app.config['DB_QUERY_COUNTING']:
+        g.db_queries = 0
+
+@app.after_request
+def _report_query_count(response):
+    # Streamed bodies query after this point; the header covers the work done before streaming
+    if 'db_queries' in g:
+        response.headers['X-DB-Queries'] = str(g.db_queries)
+        query_stats.record(request.endpoint or 'unmatched', g.db_queries)
+    return response
+
+@app.before_request
+def _start_background_workers():
+    # Started on the first request rather than at import, so scripts and label pool processes
+    # that import this module never open the RFID log or compete for its writer lock
+    if app.config['RFID_QUEUE_ENABLED']:
+        rfid_queue.start(app)
+    if app.config['ALERT_SWEEP_ENABLED']:
+        alert_sweeper.start(app)
+    if app.config['OVERDUE_SCHEDULER_ENABLED']:
+        overdue_scheduler.start(app)
+    if app.config['LOCATION_COMPACT_ENABLED']:
+        location_compactor.start(app)
+    if app.config['FLEET_CHECKPOINT_ENABLED']:
+        fleet_history.start(app)
+
+# Routes
+@app.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('digital_assets_landing'))
+    return render_template('index.html')
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        user = User.query.filter_by(username=username).first()
+        
+        if user and check_password_hash(user.password_hash, password):
+            login_user(user)
+            return redirect(url_for('digital_assets_landing'))
+        else:
+            flash('Invalid username or password')
+    
+    return render_template('login.html')
+
+@app.route('/digital_assets_landing')
+@login_required
+def digital_assets_landing():
+    """Digital Assets Landing Page - Main entry point after login"""
+    return render_template('digital_assets_landing.html')
+
+@app.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('index'))
+
+
+
+
+
+@app.route('/asset/<int:asset_id>')
+@login_required
+def asset_detail(asset_id):
+    asset = Asset.query.get_or_404(asset_id)
+    usage_history = AssetUsage.query.filter_by(asset_id=asset_id).order_by(AssetUsage.start_time.desc()).limit(10).all()
+    atlas_info = ATLAS_OF_ASSETS.get(asset.category, {})
+    next_maintenance = maintenance_schedule.refresh().next_due(asset.id)
+    return render_template('asset_detail.html', asset=asset, usage_history=usage_history, atlas_info=atlas_info,
+                           next_maintenance=next_maintenance)
+
+def _chunked(values, size=500):
+    """Yield successive slices of a list, keeping IN clauses under SQLite's variable limit"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def parse_event_time(value):
+    """Parse an ISO-8601 reader timestamp into naive UTC, matching the DateTime columns"""
+    event_time = datetime.fromisoformat(value)
+    if event_time.tzinfo is not None:
+        event_time = event_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return event_time
+
+RFID_EVENT_TYPES = ('enter', 'exit')
+
+def rfid_read_error(read):
+    """Return why a reader event cannot be applied, or None when it is well formed"""
+    if not isinstance(read, dict):
+        return 'Each event must be a JSON object'
+    if not isinstance(read.get('asset_id'), str) or not read['asset_id']:
+        return 'asset_id is required'
+    if read.get('event_type') not in RFID_EVENT_TYPES:
+        return 'event_type must be enter or exit'
+    if read.get('location') is not None and not isinstance(read['location'], str):
+        return 'location must be a string'
+    try:
+        parse_event_time(read.get('timestamp'))
+    except (TypeError, ValueError):
+        return 'Invalid timestamp'
+    return None
+
+def apply_rfid_event(asset, reader_location, event_type, event_time, active_usages):
+    """Apply a single enter/exit read to an asset without committing.
+
+    ``active_usages`` maps asset primary keys to their open AssetUsage so that
+    a batch can resolve exits without a query per event. Returns the outcome.
+    """
+    if event_type == 'enter':
+        # Asset entered a new location
+        if asset.status == 'available' and reader_location != 'Storage':
+            # Start new usage automatically
+            usage = AssetUsage(
+                asset_id=asset.id,
+                user_id=None,  # Will be determined by context
+                department=reader_location,
+                start_time=event_time,
+                status='active'
+            )
+            asset.status = 'in-use'
+            asset.location = reader_location
+            asset.last_usage = event_time
+
+            db.session.add(usage)
+            record_usage_started(usage, asset)
+            active_usages[asset.id] = usage
+            return 'usage_started'
+
+    elif event_type == 'exit':
+        # Asset left a location
+        if asset.status == 'in-use' and reader_location == 'Storage':
+            # End usage automatically
+            active_usage = active_usages.pop(asset.id, None)
+
+            if active_usage:
+                active_usage.end_time = event_time
+                active_usage.status = 'completed'
+                asset.status = 'available'
+                record_usage_ended(active_usage, asset)
+                return 'usage_ended'
+
+    return 'ignored'
+
+class LocationMismatchEngine:
+    """Flag RFID reads that place an asset where it should not be.
+
+    An in-use asset should be read in the department of its active usage;
+    any other asset only in its category's Atlas allowed_zones, when the
+    Atlas defines them. A single stray read is not enough: an alert is raised
+    once an asset has been read out of place min_reads times in a row over
+    at least min_seconds (by event time), and only once per streak. A read
+    in an expected location ends the streak. All state is one dict entry per
+    out-of-place asset, so each read costs a few dict and set lookups.
+    """
+
+    def __init__(self, min_reads, min_seconds):
+        self.min_reads = min_reads
+        self.min_seconds = timedelta(seconds=min_seconds)
+        self._zones = {category: frozenset(info['allowed_zones'])
+                       for category, info in ATLAS_OF_ASSETS.items() if info.get('allowed_zones')}
+        self._streaks = {}  # asset pk -> [first_seen, reads, alerted]
+        self._lock = threading.Lock()
+        self.stats = {'reads_checked': 0, 'mismatched_reads': 0, 'alerts_raised': 0}
+
+    def observe(self, asset, location, event_time, active_usage):
+        """Record one read; return an alert for raise_alerts when it completes a mismatch streak"""
+        if not location:
+            return None
+        department = active_usage.department if active_usage is not None else None
+        zones = None if department else self._zones.get(asset.category)
+        if department:
+            mismatch = location != department
+        else:
+            mismatch = zones is not None and location not in zones
+
+        with self._lock:
+            self.stats['reads_checked'] += 1
+            if not mismatch:
+                self._streaks.pop(asset.id, None)
+                return None
+            self.stats['mismatched_reads'] += 1
+            streak = self._streaks.get(asset.id)
+            if streak is None:
+                streak = self._streaks[asset.id] = [event_time, 0, False]
+            streak[1] += 1
+            if streak[2] or streak[1] < self.min_reads or event_time - streak[0] < self.min_seconds:
+                return None
+            streak[2] = True
+            self.stats['alerts_raised'] += 1
+
+        expected = f'in use by {department}' if department else 'allowed in ' + ', '.join(sorted(zones))
+        return {
+            'asset_id': asset.id,
+            'alert_type': 'location_mismatch',
+            'message': f'Asset {asset.name} read in {location} but is {expected}',
+            'severity': 'high' if department else 'medium'
+        }
+
+    def snapshot_stats(self):
+        return {'tracked_assets': len(self._streaks), 'min_reads': self.min_reads,
+                'min_seconds': self.min_seconds.total_seconds(), **self.stats}
+
+location_mismatch = LocationMismatchEngine(
+    app.config['LOCATION_MISMATCH_MIN_READS'],
+    app.config['LOCATION_MISMATCH_MIN_SECONDS']
+)
+
+def ingest_rfid_events(events):
+    """Apply a batch of RFID reads in order with one asset lookup and one commit.
+
+    Malformed reads and unknown assets get a failed result; the rest are still applied.
+    """
+    errors = [rfid_read_error(read) for read in events]
+    tags = list({read['asset_id'] for read, error in zip(events, errors) if error is None})
+    assets = {}
+    for chunk in _chunked(tags):
+        for asset in Asset.query.filter(Asset.asset_id.in_(chunk)):
+            assets[asset.asset_id] = asset
+
+    active_usages = {}
+    asset_pks = [asset.id for asset in assets.values()]
+    for chunk in _chunked(asset_pks):
+        open_usages = AssetUsage.query.filter(
+            AssetUsage.asset_id.in_(chunk),
+            AssetUsage.status.in_(OPEN_USAGE_STATUSES)
+        ).order_by(AssetUsage.id)
+        for usage in open_usages:
+            active_usages.setdefault(usage.asset_id, usage)
+
+    results = []
+    mismatch_alerts = []
+    location_rows = []
+    for index, (read, error) in enumerate(zip(events, errors)):
+        result = {'index': index, 'asset_id': read.get('asset_id') if isinstance(read, dict) else None}
+        asset = assets.get(read['asset_id']) if error is None else None
+        if error:
+            result.update(success=False, error=error)
+        elif not asset:
+            result.update(success=False, error='Asset not found')
+        else:
+            event_time = parse_event_time(read['timestamp'])
+            outcome = apply_rfid_event(asset, read.get('location'), read['event_type'],
+                                       event_time, active_usages)
+            if read.get('location'):
+                location_rows.append({'asset_id': asset.id, 'location': read['location'],
+                                      'event_type': read['event_type'], 'read_at': event_time})
+            if outcome == 'ignored':
+                alert = location_mismatch.observe(asset, read.get('location'), event_time,
+                                                  active_usages.get(asset.id))
+                if alert:
+                    mismatch_alerts.append(alert)
+            result.update(success=True, outcome=outcome)
+        results.append(result)
+
+    raise_alerts(mismatch_alerts)
+    bulk_insert(LocationRead, location_rows)
+    movement_analytics.record(location_rows, {asset.id: asset.category for asset in assets.values()})
+    if db.session.new or db.session.dirty or mismatch_alerts or location_rows:
+        db.session.commit()
+
+    return results
+
+def _day_spans(start, end):
+    """Yield (date, seconds) for each calendar day an interval overlaps"""
+    day = datetime.combine(start.date(), datetime.min.time())
+    while day < end:
+        next_day = day + timedelta(days=1)
+        yield day.date(), (min(end, next_day) - max(start, day)).total_seconds()
+        day = next_day
+
+class LocationHistoryCompactor:
+    """Keep location history bounded by folding old tiers into coarser ones.
+
+    Raw reads older than the raw retention become dwell intervals: consecutive
+    reads of an asset at one location extend a dwell, and a read elsewhere
+    closes it. Each asset's latest dwell stays open so the next run carries
+    on from it; reads older than that dwell's last read arrived too late to
+    place and are dropped. Dwells that closed before the dwell retention are
+    summed into per-day totals. Work is done in batches of batch_size rows,
+    one transaction each. Every worker starts the thread, but only the one
+    holding lock_path compacts.
+    """
+
+    def __init__(self, interval, raw_hours, dwell_days, lock_path, batch_size=20000):
+        self.interval = interval
+        self.leader = LeaderLock(lock_path)
+        self.raw_retention = timedelta(hours=raw_hours)
+        self.dwell_retention = timedelta(days=dwell_days)
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {'leader': False, 'runs': 0, 'reads_compacted': 0, 'late_reads': 0, 'dwells_created': 0,
+                      'dwells_summarised': 0, 'last_run_at': None, 'last_duration_seconds': None, 'errors': 0}
+
+    def start(self, flask_app):
+        """Start the compactor thread once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                            name='location-compactor', daemon=True)
+            self._thread.start()
+
+    def _run(self, flask_app):
+        self.leader.acquire()
+        self.stats['leader'] = True
+        while True:
+            time.sleep(self.interval)
+            with flask_app.app_context():
+                try:
+                    self.compact()
+                except Exception:
+                    db.session.rollback()
+                    self.stats['errors'] += 1
+                    flask_app.logger.exception('Location history compaction failed')
+
+    def compact(self, now=None):
+        """Run both tiers up to their retention cutoffs; return (reads compacted, dwells summarised)"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            started = time.perf_counter()
+            reads = dwells = 0
+            while True:
+                done = self.compact_reads(now - self.raw_retention)
+                reads += done
+                if done < self.batch_size:
+                    break
+            while True:
+                done = self.compact_dwells(now - self.dwell_retention)
+                dwells += done
+                if done < self.batch_size:
+                    break
+            self.stats['runs'] += 1
+            self.stats['last_run_at'] = now.isoformat()
+            self.stats['last_duration_seconds'] = round(time.perf_counter() - started, 4)
+        return reads, dwells
+
+    def compact_reads(self, cutoff):
+        """Fold one batch of raw reads older than cutoff into dwells; return the number of reads consumed"""
+        batch = db.session.execute(
+            select(LocationRead.id, LocationRead.asset_id, LocationRead.location, LocationRead.read_at)
+            .where(LocationRead.read_at < cutoff)
+            .order_by(LocationRead.read_at, LocationRead.id)
+            .limit(self.batch_size)
+        ).all()
+        if not batch:
+            return 0
+
+        tails = {}
+        asset_pks = list({row.asset_id for row in batch})
+        for chunk in _chunked(asset_pks):
+            for dwell in db.session.execute(
+                select(LocationDwell.id, LocationDwell.asset_id, LocationDwell.location, LocationDwell.entered_at,
+                       LocationDwell.last_seen_at, LocationDwell.reads)
+                .where(LocationDwell.asset_id.in_(chunk), LocationDwell.left_at.is_(None))
+            ):
+                tails[dwell.asset_id] = {**dwell._asdict(), 'left_at': None}
+        existing = list(tails.values())
+
+        created = []
+        late = 0
+        for _, asset_pk, location, read_at in batch:
+            tail = tails.get(asset_pk)
+            if tail is not None and read_at < tail['last_seen_at']:
+                late += 1
+            elif tail is not None and tail['location'] == location:
+                tail['last_seen_at'] = read_at
+                tail['reads'] += 1
+            else:
+                if tail is not None:
+                    tail['left_at'] = read_at
+                tail = {'asset_id': asset_pk, 'location': location, 'entered_at': read_at,
+                        'last_seen_at': read_at, 'left_at': None, 'reads': 1}
+                tails[asset_pk] = tail
+                created.append(tail)
+
+        if existing:
+            table = LocationDwell.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('dwell_pk')).values(
+                    last_seen_at=bindparam('seen'), left_at=bindparam('left'), reads=bindparam('read_count')
+                ),
+                [{'dwell_pk': tail['id'], 'seen': tail['last_seen_at'], 'left': tail['left_at'],
+                  'read_count': tail['reads']} for tail in existing]
+            )
+        bulk_insert(LocationDwell, created)
+        for chunk in _chunked([row.id for row in batch]):
+            db.session.execute(LocationRead.__table__.delete().where(LocationRead.id.in_(chunk)))
+        db.session.commit()
+
+        self.stats['reads_compacted'] += len(batch)
+        self.stats['late_reads'] += late
+        self.stats['dwells_created'] += len(created)
+        return len(batch)
+
+    def compact_dwells(self, cutoff):
+        """Sum one batch of dwells that closed before cutoff into daily rows; return the number consumed"""
+        batch = db.session.execute(
+            select(LocationDwell.id, LocationDwell.asset_id, LocationDwell.location, LocationDwell.entered_at,
+                   LocationDwell.left_at, LocationDwell.reads)
+            .where(LocationDwell.left_at < cutoff)
+            .order_by(LocationDwell.left_at)
+            .limit(self.batch_size)
+        ).all()
+        if not batch:
+            return 0
+
+        totals = {}
+        for _, asset_pk, location, entered_at, left_at, reads in batch:
+            first_day = entered_at.date()
+            entry = totals.setdefault((asset_pk, first_day, location), [0.0, 0, 0])
+            entry[1] += 1
+            entry[2] += reads
+            for day, seconds in _day_spans(entered_at, left_at):
+                totals.setdefault((asset_pk, day, location), [0.0, 0, 0])[0] += seconds
+
+        days = [day for _, day, _ in totals]
+        existing = {}
+        for chunk in _chunked(list({asset_pk for asset_pk, _, _ in totals})):
+            existing.update(
+                ((row.asset_id, row.day, row.location), row.id) for row in db.session.execute(
+                    select(LocationDaily.id, LocationDaily.asset_id, LocationDaily.day, LocationDaily.location)
+                    .where(LocationDaily.asset_id.in_(chunk), LocationDaily.day.between(min(days), max(days)))
+                )
+            )
+
+        updates = [{'daily_pk': existing[key], 'seconds': seconds, 'added_visits': visits, 'added_reads': reads}
+                   for key, (seconds, visits, reads) in totals.items() if key in existing]
+        if updates:
+            table = LocationDaily.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('daily_pk')).values(
+                    dwell_seconds=table.c.dwell_seconds + bindparam('seconds'),
+                    visits=table.c.visits + bindparam('added_visits'),
+                    reads=table.c.reads + bindparam('added_reads')
+                ),
+                updates
+            )
+        bulk_insert(LocationDaily, [
+            {'asset_id': asset_pk, 'day': day, 'location': location, 'dwell_seconds': seconds,
+             'visits': visits, 'reads': reads}
+            for (asset_pk, day, location), (seconds, visits, reads) in totals.items()
+            if (asset_pk, day, location) not in existing
+        ])
+        for chunk in _chunked([row.id for row in batch]):
+            db.session.execute(LocationDwell.__table__.delete().where(LocationDwell.id.in_(chunk)))
+        db.session.commit()
+
+        self.stats['dwells_summarised'] += len(batch)
+        return len(batch)
+
+location_compactor = LocationHistoryCompactor(
+    app.config['LOCATION_COMPACT_SECONDS'], app.config['LOCATION_RAW_RETENTION_HOURS'],
+    app.config['LOCATION_DWELL_RETENTION_DAYS'], os.path.join(app.instance_path, 'location_compactor.lock')
+)
+
+def asset_location_at(asset_pk, when):
+    """Where an asset was at a moment, from the finest history tier still holding it.
+
+    Returns (location, tier) or (None, None). The daily tier only knows where
+    the asset spent most of that day.
+    """
+    read = db.session.execute(
+        select(LocationRead.location, LocationRead.read_at)
+        .where(LocationRead.asset_id == asset_pk, LocationRead.read_at <= when)
+        .order_by(LocationRead.read_at.desc()).limit(1)
+    ).first()
+    dwell = db.session.execute(
+        select(LocationDwell.location, LocationDwell.entered_at)
+        .where(LocationDwell.asset_id == asset_pk, LocationDwell.entered_at <= when,
+               or_(LocationDwell.left_at.is_(None), LocationDwell.left_at > when))
+        .order_by(LocationDwell.entered_at.desc()).limit(1)
+    ).first()
+    # Raw reads are newer than every compacted dwell, so a read wins when both qualify
+    if read is not None and (dwell is None or read.read_at >= dwell.entered_at):
+        return read.location, 'read'
+    if dwell is not None:
+        return dwell.location, 'dwell'
+    daily = db.session.execute(
+        select(LocationDaily.location)
+        .where(LocationDaily.asset_id == asset_pk, LocationDaily.day == when.date())
+        .order_by(LocationDaily.dwell_seconds.desc()).limit(1)
+    ).scalar()
+    return (daily, 'daily') if daily is not None else (None, None)
+
+# Dwell histograms use log-scaled buckets, four per doubling, so a percentile read back is within about 19%
+DWELL_BUCKETS_PER_DOUBLING = 4
+
+def dwell_bucket(seconds):
+    """Histogram bucket for a stay of this length; bucket 0 holds stays under a second"""
+    if seconds < 1:
+        return 0
+    return int(math.log2(seconds) * DWELL_BUCKETS_PER_DOUBLING) + 1
+
+def _dwell_bucket_bounds(bucket):
+    if bucket == 0:
+        return 0.0, 1.0
+    return 2 ** ((bucket - 1) / DWELL_BUCKETS_PER_DOUBLING), 2 ** (bucket / DWELL_BUCKETS_PER_DOUBLING)
+
+def histogram_percentiles(histogram, percentiles):
+    """Estimate percentiles (0-100) from a {bucket: count} dwell histogram.
+
+    Walks the buckets in order and interpolates linearly inside the one
+    holding each rank. Returns {percentile: seconds}, empty if there is no data.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return {}
+    buckets = sorted(histogram.items())
+    result = {}
+    for percentile in percentiles:
+        rank = percentile / 100 * total
+        seen = 0
+        for bucket, count in buckets:
+            if seen + count >= rank:
+                low, high = _dwell_bucket_bounds(bucket)
+                result[percentile] = low + (high - low) * (rank - seen) / count
+                break
+            seen += count
+    return result
+
+def _fold_movement(visits, flows, dwells, asset_pk, category, location, read_at):
+    """Apply one read to {asset pk: [location, entered_at, last_seen_at]}, counting any move.
+
+    flows maps (day, category, from, to) -> [moves] and dwells maps
+    (day, category, location, bucket) -> [visits, seconds]; both are keyed
+    by the day of the move. Returns 'entered', 'seen', 'moved' or 'late'.
+    """
+    visit = visits.get(asset_pk)
+    if visit is None:
+        visits[asset_pk] = [location, read_at, read_at]
+        return 'entered'
+    if read_at < visit[2]:
+        return 'late'
+    if location == visit[0]:
+        visit[2] = read_at
+        return 'seen'
+    day = read_at.date()
+    flows.setdefault((day, category, visit[0], location), [0])[0] += 1
+    seconds = (read_at - visit[1]).total_seconds()
+    totals = dwells.setdefault((day, category, visit[0], dwell_bucket(seconds)), [0, 0.0])
+    totals[0] += 1
+    totals[1] += seconds
+    visits[asset_pk] = [location, read_at, read_at]
+    return 'moved'
+
+def _flow_rows(flows):
+    return [{'day': day, 'category': category, 'from_location': source, 'to_location': target, 'moves': moves}
+            for (day, category, source, target), (moves,) in flows.items()]
+
+def _dwell_rows(dwells):
+    return [{'day': day, 'category': category, 'location': location, 'bucket': bucket,
+             'visits': visits, 'dwell_seconds': seconds}
+            for (day, category, location, bucket), (visits, seconds) in dwells.items()]
+
+def rebuild_movement_analytics(conn):
+    """Recompute visits, flows and dwell histograms from the dwell and raw read tiers.
+
+    A dwell stands for reads at its entry and last sighting. Daily
+    summaries no longer say when an asset moved, so older history is left out.
+    """
+    dwell, read, asset = LocationDwell.__table__, LocationRead.__table__, Asset.__table__
+    history = union_all(
+        select(dwell.c.asset_id, dwell.c.location, dwell.c.entered_at.label('read_at')),
+        select(dwell.c.asset_id, dwell.c.location, dwell.c.last_seen_at),
+        select(read.c.asset_id, read.c.location, read.c.read_at)
+    ).subquery()
+    query = select(history.c.asset_id, asset.c.category, history.c.location, history.c.read_at) \
+        .join(asset, asset.c.id == history.c.asset_id) \
+        .order_by(history.c.asset_id, history.c.read_at)
+
+    visits, flows, dwells = {}, {}, {}
+    for row in conn.execution_options(yield_per=10000).execute(query):
+        _fold_movement(visits, flows, dwells, *row)
+
+    for model in (LocationVisit, LocationFlow, DwellRollup):
+        conn.execute(model.__table__.delete())
+    visit_rows = [{'asset_id': asset_pk, 'location': location, 'entered_at': entered_at, 'last_seen_at': last_seen_at}
+                  for asset_pk, (location, entered_at, last_seen_at) in visits.items()]
+    for model, rows in ((LocationVisit, visit_rows), (LocationFlow, _flow_rows(flows)),
+                        (DwellRollup, _dwell_rows(dwells))):
+        for chunk in _chunked(rows, 5000):
+            conn.execute(model.__table__.insert(), chunk)
+
+class MovementAnalytics:
+    """Location-to-location flows and dwell-time percentiles, folded in as RFID reads arrive.
+
+    Each asset's current stay is kept in LocationVisit. A read at the same
+    location extends it; a read elsewhere ends it, adding one move to
+    LocationFlow and the stay's length to the DwellRollup histogram, keyed
+    by the day of the move and the asset's category. Reads older than the
+    stay's last read arrived late and are skipped, as the compactor does.
+    Queries sum the daily rows of a window and never rescan read history;
+    stays still open are not in the dwell figures.
+    """
+
+    PERCENTILES = (50, 90, 95)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'reads': 0, 'moves': 0, 'late_reads': 0}
+
+    def record(self, reads, categories):
+        """Fold reads (dicts with asset_id, location, read_at) into the rollups without committing.
+
+        categories maps asset pk to category. Reads are applied in event
+        time order, so a batch that arrives shuffled is not counted as late.
+        """
+        if not reads:
+            return
+        visits = {}
+        for chunk in _chunked(list({read['asset_id'] for read in reads})):
+            for asset_pk, *visit in db.session.execute(
+                    select(LocationVisit.asset_id, LocationVisit.location, LocationVisit.entered_at,
+                           LocationVisit.last_seen_at).where(LocationVisit.asset_id.in_(chunk))):
+                visits[asset_pk] = visit
+
+        flows, dwells = {}, {}
+        outcomes = Counter()
+        for read in sorted(reads, key=operator.itemgetter('read_at')):
+            asset_pk = read['asset_id']
+            outcomes[_fold_movement(visits, flows, dwells, asset_pk, categories.get(asset_pk, 'Unknown'),
+                                    read['location'], read['read_at'])] += 1
+
+        # Upsert so a worker placing the same asset concurrently cannot fail the batch; the newer stay wins
+        table = LocationVisit.__table__
+        statement = upsert_insert(table)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.asset_id],
+            set_={'location': statement.excluded.location, 'entered_at': statement.excluded.entered_at,
+                  'last_seen_at': statement.excluded.last_seen_at},
+            where=table.c.last_seen_at <= statement.excluded.last_seen_at
+        ), [{'asset_id': asset_pk, 'location': location, 'entered_at': entered_at, 'last_seen_at': last_seen_at}
+            for asset_pk, (location, entered_at, last_seen_at) in sorted(visits.items())])
+        _merge_rollup(LocationFlow, ('day', 'category', 'from_location', 'to_location'), ('moves',),
+                      _flow_rows(flows))
+        _merge_rollup(DwellRollup, ('day', 'category', 'location', 'bucket'), ('visits', 'dwell_seconds'),
+                      _dwell_rows(dwells))
+
+        with self._lock:
+            self.stats['reads'] += len(reads)
+            self.stats['moves'] += outcomes['moved']
+            self.stats['late_reads'] += outcomes['late']
+
+    def flows(self, first_day, last_day, category=None):
+        """Return {(from, to): moves} over the days first_day..last_day inclusive"""
+        query = select(LocationFlow.from_location, LocationFlow.to_location, func.sum(LocationFlow.moves)) \
+            .where(LocationFlow.day.between(first_day, last_day)) \
+            .group_by(LocationFlow.from_location, LocationFlow.to_location)
+        if category:
+            query = query.where(LocationFlow.category == category)
+        return {(source, target): int(moves) for source, target, moves in db.session.execute(query)}
+
+    def dwell(self, first_day, last_day, category=None, location=None, by_category=True):
+        """Return {(category, location): summary} of stays that ended on first_day..last_day.
+
+        With by_category=False categories are pooled and keys are (None, location).
+        """
+        group = [DwellRollup.category, DwellRollup.location] if by_category else [DwellRollup.location]
+        query = select(*group, DwellRollup.bucket, func.sum(DwellRollup.visits), func.sum(DwellRollup.dwell_seconds)) \
+            .where(DwellRollup.day.between(first_day, last_day)) \
+            .group_by(*group, DwellRollup.bucket)
+        if category:
+            query = query.where(DwellRollup.category == category)
+        if location:
+            query = query.where(DwellRollup.location == location)
+
+        histograms = {}
+        seconds = Counter()
+        for *names, bucket, visits, total in db.session.execute(query):
+            key = tuple(names) if by_category else (None, names[0])
+            histograms.setdefault(key, {})[bucket] = int(visits)
+            seconds[key] += total
+
+        summaries = {}
+        for key, histogram in histograms.items():
+            visits = sum(histogram.values())
+            summary = {'visits': visits, 'mean_minutes': round(seconds[key] / visits / 60, 1)}
+            for percentile, value in histogram_percentiles(histogram, self.PERCENTILES).items():
+                summary[f'p{percentile}_minutes'] = round(value / 60, 1)
+            summaries[key] = summary
+        return summaries
+
+movement_analytics = MovementAnalytics()
+
+def flow_matrix(flows):
+    """Turn {(from, to): moves} into (locations, matrix) with matrix[from][to] in sorted location order"""
+    locations = sorted({location for pair in flows for location in pair})
+    index = {location: position for position, location in enumerate(locations)}
+    matrix = [[0] * len(locations) for _ in locations]
+    for (source, target), moves in flows.items():
+        matrix[index[source]][index[target]] = moves
+    return locations, matrix
+
+class RFIDEventQueue:
+    """Durable append-only log of RFID reads drained by a single writer thread.
+
+    Readers are acknowledged as soon as their event is appended to the log.
+    Every worker process appends to the same file under an exclusive file
+    lock, and each runs a writer thread, but only the one holding the
+    writer lock file applies events; the others wait to take over if it
+    exits. The writer applies events in batches through ingest_rfid_events
+    and records the byte offset it has committed, so unapplied events are
+    replayed after a restart. Lines that are not valid reads are skipped
+    and counted as failed. The log is truncated whenever it is fully
+    drained. Delivery is at least once: a crash between applying a batch
+    and recording its offset replays that batch.
+    """
+
+    COMPACT_BYTES = 1024 * 1024
+    POLL_SECONDS = 0.2  # other processes' appends cannot wake the writer
+
+    def __init__(self, path, batch_size=500, fsync=False):
+        self.path = path
+        self.offset_path = path + '.offset'
+        self.lock_path = path + '.lock'
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._log = None
+        self._writer_lock = LeaderLock(self.lock_path)
+        self._applied = 0
+        self._thread = None
+        self.stats = {'writer': False, 'enqueued': 0, 'applied': 0, 'failed': 0, 'batches': 0,
+                      'retries': 0, 'last_batch_seconds': None}
+
+    @staticmethod
+    def _lock_file(f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    @staticmethod
+    def _unlock_file(f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_offset(self):
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, position):
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(position))
+        os.replace(tmp_path, self.offset_path)
+
+    def start(self, flask_app):
+        """Open the log for appending and start the writer thread once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._log = open(self.path, 'ab')
+            self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                            name='rfid-writer', daemon=True)
+            self._thread.start()
+
+    def append(self, event):
+        """Persist one event to the log and wake the writer"""
+        line = json.dumps(event, separators=(',', ':')).encode() + b'\n'
+        with self._lock:
+            self._lock_file(self._log)
+            try:
+                self._log.write(line)
+                self._log.flush()
+                if self.fsync:
+                    os.fsync(self._log.fileno())
+            finally:
+                self._unlock_file(self._log)
+            self.stats['enqueued'] += 1
+            self._wakeup.notify()
+
+    def depth_bytes(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        return max(size - self._read_offset(), 0)
+
+    def _acquire_writer(self):
+        """Block until this process holds the writer lock, then load the committed offset"""
+        self._writer_lock.acquire()
+        with self._lock:
+            self._lock_file(self._log)
+            try:
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+                # Drop a torn final line left by a crash mid-append
+                end = data.rfind(b'\n') + 1
+                if end != len(data):
+                    os.truncate(self.path, end)
+                self._applied = min(self._read_offset(), end)
+            finally:
+                self._unlock_file(self._log)
+            self.stats['writer'] = True
+
+    def _read_batch(self):
+        """Return (events, end_offset) for up to batch_size unapplied complete lines"""
+        with open(self.path, 'rb') as f:
+            while True:
+                with self._lock:
+                    end = os.fstat(f.fileno()).st_size
+                    if self._applied < end:
+                        break
+                    self._wakeup.wait(self.POLL_SECONDS)
+            f.seek(self._applied)
+            lines = f.readlines(min(end - self._applied, self.batch_size * 512))[:self.batch_size]
+        # Another process may be mid-append; a line without its newline is read next time
+        if lines and not lines[-1].endswith(b'\n'):
+            lines.pop()
+        position = self._applied + sum(len(line) for line in lines)
+
+        events = []
+        for line in lines:
+            try:
+                read = json.loads(line)
+            except ValueError:
+                read = None
+            if rfid_read_error(read) is None:
+                events.append(read)
+            else:
+                self.stats['failed'] += 1
+        return events, position
+
+    def _commit_offset(self, position):
+        with self._lock:
+            self._applied = position
+            self._write_offset(position)
+            if position < self.COMPACT_BYTES:
+                return
+            self._lock_file(self._log)
+            try:
+                if os.path.getsize(self.path) == position:
+                    # Reset the offset first: a crash in between replays reads rather than losing them
+                    self._write_offset(0)
+                    os.truncate(self.path, 0)
+                    self._applied = 0
+            finally:
+                self._unlock_file(self._log)
 
-def check_asset_alerts(asset):
-    """Check and create alerts for asset"""
-    alerts = []
-    
-    # Check for rental expiry
-    if asset.ownership == 'rental' and asset.last_usage:
-        days_since_usage = (datetime.utcnow() - asset.last_usage).days
-        if days_since_usage > 7:  # Alert if rental not used for 7 days
-            alerts.append({
-                'type': 'rental_expiry',
-                'message': f'Rental asset {asset.name} has not been used for {days_since_usage} days',
-                'severity': 'high'
-            })
-    
-    # Check for inactivity
-    if asset.last_usage:
-        days_inactive = (datetime.utcnow() - asset.last_usage).days
-        if days_inactive > 30:
-            alerts.append({
-                'type': 'inactivity',
-                'message': f'Asset {asset.name} has been inactive for {days_inactive} days',
-                'severity': 'medium'
-            })
-    
-    return alerts
+    def _run(self, flask_app):
+        self._acquire_writer()
+        backoff = 0.05
+        while True:
+            events, position = self._read_batch()
+            if position == self._applied:
+                # Only a partial line so far; let its writer finish
+                time.sleep(self.POLL_SECONDS)
+                continue
+            started = time.perf_counter()
+            try:
+                with flask_app.app_context():
+                    results = ingest_rfid_events(events) if events else []
+            except Exception:
+                # Database busy or unavailable: keep the offset and retry the batch
+                with flask_app.app_context():
+                    db.session.rollback()
+                self.stats['retries'] += 1
+                flask_app.logger.exception('RFID writer failed to apply batch, retrying')
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5)
+                continue
 
-# Routes
-@app.route('/')
-def index():
-    if current_user.is_authenticated:
-        return redirect(url_for('digital_assets_landing'))
-    return render_template('index.html')
+            backoff = 0.05
+            self._commit_offset(position)
+            applied = sum(1 for result in results if result['success'])
+            self.stats['applied'] += applied
+            self.stats['failed'] += len(results) - applied
+            self.stats['batches'] += 1
+            self.stats['last_batch_seconds'] = round(time.perf_counter() - started, 4)
 
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        username = request.form['username']
-        password = request.form['password']
-        user = User.query.filter_by(username=username).first()
-        
-        if user and check_password_hash(user.password_hash, password):
-            login_user(user)
-            return redirect(url_for('digital_assets_landing'))
+rfid_queue = RFIDEventQueue(
+    app.config['RFID_QUEUE_PATH'],
+    batch_size=app.config['RFID_QUEUE_BATCH_SIZE'],
+    fsync=app.config['RFID_QUEUE_FSYNC']
+)
+
+class RFIDReadSuppressor:
+    """Drop repeated reads of the same tag at the same reader within a time window.
+
+    Keys are (asset_id, location, event_type). A repeat refreshes the key, so a
+    tag sitting in a reader's field stays suppressed until it goes quiet for a
+    full window. Entries are kept in last-seen order, which lets expired and
+    overflow keys be evicted from the front in O(1).
+    """
+
+    def __init__(self, window_seconds, max_keys):
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.suppressed = 0
+        self.forwarded = 0
+
+    def _evict(self, now):
+        horizon = now - self.window
+        while self._seen:
+            if next(iter(self._seen.values())) > horizon and len(self._seen) < self.max_keys:
+                break
+            self._seen.popitem(last=False)
+
+    def should_apply(self, asset_id, location, event_type, now=None):
+        """Return False when the read repeats an accepted one within the window.
+
+        Only remember() records a read, so a read that passes here and then
+        fails validation or the database is not suppressed when retried.
+        """
+        if self.window <= 0:
+            return True
+
+        now = time.monotonic() if now is None else now
+        key = (asset_id, location, event_type)
+        with self._lock:
+            self._evict(now)
+            if key not in self._seen:
+                return True
+            self._seen[key] = now
+            self._seen.move_to_end(key)
+            self.suppressed += 1
+            return False
+
+    def note_repeat(self):
+        """Count a repeat dropped by the caller, such as a second copy within one batch"""
+        with self._lock:
+            self.suppressed += 1
+
+    def remember(self, asset_id, location, event_type, now=None):
+        """Record a read that was queued or applied, so repeats within the window are dropped"""
+        now = time.monotonic() if now is None else now
+        key = (asset_id, location, event_type)
+        with self._lock:
+            self.forwarded += 1
+            if self.window <= 0:
+                return
+            self._evict(now)
+            self._seen[key] = now
+            self._seen.move_to_end(key)
+
+    def stats(self):
+        total = self.suppressed + self.forwarded
+        return {
+            'window_seconds': self.window,
+            'tracked_keys': len(self._seen),
+            'max_keys': self.max_keys,
+            'suppressed': self.suppressed,
+            'forwarded': self.forwarded,
+            'suppression_ratio': round(self.suppressed / total, 4) if total else 0.0
+        }
+
+rfid_suppressor = RFIDReadSuppressor(
+    app.config['RFID_DEDUP_WINDOW_SECONDS'],
+    app.config['RFID_DEDUP_MAX_KEYS']
+)
+
+def _parse_rfid_batch():
+    """Read RFID events from a JSON array, an {"events": [...]} object or NDJSON"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('events')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of events')
+    return data
+
+@app.route('/rfid_event', methods=['POST'])
+def rfid_event():
+    """Handle RFID events from readers"""
+    data = request.get_json(silent=True)
+    error = rfid_read_error(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    if not rfid_suppressor.should_apply(data['asset_id'], data.get('location'), data['event_type']):
+        return jsonify({'success': True, 'suppressed': True})
+
+    if app.config['RFID_QUEUE_ENABLED']:
+        if fleet_cache.get(data['asset_id']) is None:
+            return jsonify({'error': 'Asset not found'}), 404
+        # Acknowledge once the read is durable; the writer thread applies it
+        rfid_queue.start(app)
+        rfid_queue.append(data)
+        rfid_suppressor.remember(data['asset_id'], data.get('location'), data['event_type'])
+        return jsonify({'success': True, 'queued': True}), 202
+
+    result = ingest_rfid_events([data])[0]
+    if not result['success']:
+        if result['error'] == 'Asset not found':
+            return jsonify({'error': 'Asset not found'}), 404
+        return jsonify({'error': result['error']}), 400
+
+    rfid_suppressor.remember(data['asset_id'], data.get('location'), data['event_type'])
+    return jsonify({'success': True})
+
+@app.route('/rfid_events', methods=['POST'])
+def rfid_events():
+    """Handle a batch of RFID events from readers in a single transaction"""
+    try:
+        events = _parse_rfid_batch()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    max_events = app.config['RFID_BATCH_MAX_EVENTS']
+    if len(events) > max_events:
+        return jsonify({'success': False, 'error': f'Batch exceeds {max_events} events'}), 413
+
+    results = [None] * len(events)
+    kept = []
+    first_copies = {}  # key -> index of its first copy in this batch
+    for index, read in enumerate(events):
+        error = rfid_read_error(read)
+        if error:
+            results[index] = {'index': index, 'asset_id': read.get('asset_id') if isinstance(read, dict) else None,
+                              'success': False, 'error': error}
+            continue
+        key = (read['asset_id'], read.get('location'), read['event_type'])
+        repeat = rfid_suppressor.window > 0 and key in first_copies
+        if not repeat and rfid_suppressor.should_apply(*key):
+            first_copies.setdefault(key, index)
+            kept.append(index)
         else:
-            flash('Invalid username or password')
-    
-    return render_template('login.html')
+            results[index] = {'index': index, 'asset_id': read['asset_id'],
+                              'success': True, 'outcome': 'suppressed'}
 
-@app.route('/digital_assets_landing')
+    for index, result in zip(kept, ingest_rfid_events([events[i] for i in kept])):
+        result['index'] = index
+        results[index] = result
+        if result['success']:
+            read = events[index]
+            rfid_suppressor.remember(read['asset_id'], read.get('location'), read['event_type'])
+
+    # A repeat of an earlier copy in this batch shares that copy's failure instead of reading as suppressed
+    for index, result in enumerate(results):
+        if result.get('outcome') == 'suppressed':
+            read = events[index]
+            first = first_copies.get((read['asset_id'], read.get('location'), read['event_type']))
+            if first is None:
+                continue
+            if results[first]['success']:
+                rfid_suppressor.note_repeat()
+            else:
+                results[index] = dict(results[first], index=index)
+
+    return jsonify({
+        'success': True,
+        'processed': len(results),
+        'applied': sum(1 for result in results if result['success'] and result['outcome'] != 'suppressed'),
+        'suppressed': sum(1 for result in results if result.get('outcome') == 'suppressed'),
+        'results': results
+    })
+
+@app.route('/api/rfid/queue')
 @login_required
-def digital_assets_landing():
-    """Digital Assets Landing Page - Main entry point after login"""
-    return render_template('digital_assets_landing.html')
+def rfid_queue_status():
+    """Report RFID writer queue depth and throughput counters"""
+    if app.config['RFID_QUEUE_ENABLED']:
+        rfid_queue.start(app)
+    return jsonify({
+        'enabled': app.config['RFID_QUEUE_ENABLED'],
+        'pending_bytes': rfid_queue.depth_bytes(),
+        **rfid_queue.stats
+    })
 
-@app.route('/logout')
+@app.route('/api/assets/<int:asset_id>/maintenance', methods=['POST'])
 @login_required
-def logout():
-    logout_user()
-    return redirect(url_for('index'))
+def record_maintenance(asset_id):
+    """Log completed maintenance; the asset's next due date moves forward by its interval"""
+    asset = Asset.query.get_or_404(asset_id)
+    data = request.get_json(silent=True) or request.form
+    try:
+        performed_at = parse_event_time(data['performed_at']) if data.get('performed_at') else datetime.utcnow()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid performed_at'}), 400
 
+    db.session.add(MaintenanceRecord(
+        asset_id=asset.id,
+        performed_at=performed_at,
+        maintenance_type=data.get('maintenance_type', 'preventive'),
+        performed_by=current_user.id,
+        notes=data.get('notes')
+    ))
+    if asset.status == 'maintenance':
+        asset.status = 'available'
+    db.session.commit()
 
+    next_due = maintenance_schedule.refresh().next_due(asset.id)
+    return jsonify({'success': True, 'next_due': next_due.isoformat() if next_due else None})
 
+@app.route('/api/maintenance/due')
+@login_required
+def maintenance_due():
+    """Counts per maintenance window, plus the assets due in one window when ?window= is given"""
+    schedule = maintenance_schedule.refresh()
+    payload = {'windows': schedule.windows(), 'assets': len(schedule.due),
+               'build_seconds': round(schedule.build_seconds, 4)}
 
+    window = request.args.get('window')
+    if window:
+        bounds = {label.lower().replace(' ', '_'): (start, end) for label, start, end in MAINTENANCE_WINDOWS}
+        if window not in bounds:
+            return jsonify({'error': f'window must be one of {", ".join(bounds)}'}), 400
+        limit = min(request.args.get('limit', 100, type=int), app.config['API_PAGE_MAX'])
+        asset_pks = schedule.assets_due(*bounds[window], limit=limit)
+        names = {}
+        for chunk in _chunked(asset_pks):
+            names.update(db.session.query(Asset.id, Asset.asset_id).filter(Asset.id.in_(chunk)))
+        payload['due'] = [{'id': pk, 'asset_id': names.get(pk), 'due': schedule.next_due(pk).isoformat()}
+                          for pk in asset_pks]
+    return jsonify(payload)
 
-@app.route('/asset/<int:asset_id>')
+@app.route('/api/usage/overdue')
 @login_required
-def asset_detail(asset_id):
+def overdue_scheduler_status():
+    """Report overdue scheduler counters and the next pending deadline"""
+    deadline = overdue_scheduler.next_deadline()
+    return jsonify({
+        'enabled': app.config['OVERDUE_SCHEDULER_ENABLED'],
+        'pending': overdue_scheduler.pending(),
+        'next_deadline': deadline.isoformat() if deadline else None,
+        'overdue_usages': AssetUsage.query.filter_by(status='overdue').count(),
+        **overdue_scheduler.stats
+    })
+
+# Dimensions /api/alerts/groups can group by; department is the asset's current location
+ALERT_GROUP_COLUMNS = {
+    'alert_type': Alert.alert_type,
+    'severity': Alert.severity,
+    'department': Asset.location,
+}
+
+def _alert_status_filter(status):
+    if status == 'open':
+        return Alert.is_resolved.is_(False)
+    if status == 'resolved':
+        return Alert.is_resolved.is_(True)
+    return None
+
+@app.route('/api/alerts/groups')
+@login_required
+def alert_groups():
+    """Alert counts grouped by type, severity and/or department, aggregated in SQL"""
+    by = [name.strip() for name in request.args.get('by', 'alert_type').split(',') if name.strip()]
+    unknown = [name for name in by if name not in ALERT_GROUP_COLUMNS]
+    if unknown or not by:
+        return jsonify({'error': f'by must use {", ".join(ALERT_GROUP_COLUMNS)}'}), 400
+
+    columns = [ALERT_GROUP_COLUMNS[name].label(name) for name in by]
+    alerts = func.count(Alert.id)
+    query = db.session.query(
+        *columns,
+        alerts,
+        func.sum(func.coalesce(Alert.occurrences, 1)),
+        func.max(func.coalesce(Alert.last_seen, Alert.created_at))
+    ).join(Asset, Asset.id == Alert.asset_id).group_by(*columns).order_by(alerts.desc())
+    status_filter = _alert_status_filter(request.args.get('status', 'open'))
+    if status_filter is not None:
+        query = query.filter(status_filter)
+
+    return jsonify([{
+        **dict(zip(by, row[:len(by)])),
+        'alerts': row[len(by)],
+        'occurrences': int(row[len(by) + 1] or 0),
+        'last_seen': _json_value(row[len(by) + 2])
+    } for row in query])
+
+@app.route('/api/alerts/resolve', methods=['POST'])
+@login_required
+def resolve_alerts():
+    """Resolve every open alert matching the filters with a single UPDATE"""
+    data = request.get_json(silent=True) or {}
+    conditions = []
+    if data.get('ids'):
+        try:
+            if not isinstance(data['ids'], list):
+                raise TypeError
+            ids = [int(alert_id) for alert_id in data['ids']]
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'ids must be a list of integers'}), 400
+        conditions.append(Alert.id.in_(ids))
+    for field in ('alert_type', 'severity', 'asset_id'):
+        if data.get(field):
+            conditions.append(getattr(Alert, field) == data[field])
+    if data.get('department'):
+        conditions.append(Alert.asset_id.in_(select(Asset.id).where(Asset.location == data['department'])))
+    if data.get('last_seen_before'):
+        try:
+            cutoff = parse_event_time(data['last_seen_before'])
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid last_seen_before'}), 400
+        conditions.append(func.coalesce(Alert.last_seen, Alert.created_at) < cutoff)
+    if not conditions and not data.get('all'):
+        return jsonify({'success': False, 'error': 'Give at least one filter, or "all": true'}), 400
+
+    result = db.session.execute(
+        Alert.__table__.update()
+        .where(Alert.is_resolved.is_(False), *conditions)
+        .values(is_resolved=True, resolved_at=datetime.utcnow())
+    )
+    db.session.commit()
+    return jsonify({'success': True, 'resolved': result.rowcount})
+
+@app.route('/api/assets/<int:asset_id>/trail')
+@login_required
+def asset_trail(asset_id):
+    """An asset's movement history over ?start=&end= (default: the last 24 hours).
+
+    Each tier covers the part of the range it still holds: daily summaries
+    for the oldest days, dwell intervals, then raw reads. ?at= instead
+    answers where the asset was at one moment.
+    """
     asset = Asset.query.get_or_404(asset_id)
-    usage_history = AssetUsage.query.filter_by(asset_id=asset_id).order_by(AssetUsage.start_time.desc()).limit(10).all()
-    atlas_info = ATLAS_OF_ASSETS.get(asset.category, {})
-    return render_template('asset_detail.html', asset=asset, usage_history=usage_history, atlas_info=atlas_info)
+    try:
+        at = parse_event_time(request.args['at']) if request.args.get('at') else None
+        end = parse_event_time(request.args['end']) if request.args.get('end') else datetime.utcnow()
+        start = parse_event_time(request.args['start']) if request.args.get('start') else end - timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'Invalid timestamp'}), 400
+    if at is not None:
+        location, tier = asset_location_at(asset.id, at)
+        return jsonify({'asset_id': asset.asset_id, 'at': at.isoformat(), 'location': location, 'tier': tier})
 
-@app.route('/rfid_event', methods=['POST'])
-def rfid_event():
-    """Handle RFID events from readers"""
-    data = request.get_json()
-    
-    asset_id = data.get('asset_id')
-    reader_location = data.get('location')
-    event_type = data.get('event_type')  # 'enter' or 'exit'
-    timestamp = data.get('timestamp')
-    
-    asset = Asset.query.filter_by(asset_id=asset_id).first()
-    if not asset:
-        return jsonify({'error': 'Asset not found'}), 404
-    
-    if event_type == 'enter':
-        # Asset entered a new location
-        if asset.status == 'available' and reader_location != 'Storage':
-            # Start new usage automatically
-            usage = AssetUsage(
-                asset_id=asset.id,
-                user_id=None,  # Will be determined by context
-                department=reader_location,
-                start_time=datetime.fromisoformat(timestamp),
-                status='active'
-            )
-            asset.status = 'in-use'
-            asset.location = reader_location
-            asset.last_usage = datetime.fromisoformat(timestamp)
-            
-            db.session.add(usage)
-            db.session.commit()
-            
-            # Generate alert if needed
-            check_asset_alerts(asset)
-            
-    elif event_type == 'exit':
-        # Asset left a location
-        if asset.status == 'in-use' and reader_location == 'Storage':
-            # End usage automatically
-            active_usage = AssetUsage.query.filter_by(
-                asset_id=asset.id, 
-                status='active'
-            ).first()
-            
-            if active_usage:
-                active_usage.end_time = datetime.fromisoformat(timestamp)
-                active_usage.status = 'completed'
-                asset.status = 'available'
-                
-                db.session.commit()
-    
-    return jsonify({'success': True})
+    limit = app.config['API_PAGE_MAX']
+    daily = db.session.execute(
+        select(LocationDaily.day, LocationDaily.location, LocationDaily.dwell_seconds, LocationDaily.visits,
+               LocationDaily.reads)
+        .where(LocationDaily.asset_id == asset.id, LocationDaily.day.between(start.date(), end.date()))
+        .order_by(LocationDaily.day, LocationDaily.dwell_seconds.desc())
+    ).all()
+    dwells = db.session.execute(
+        select(LocationDwell.location, LocationDwell.entered_at, LocationDwell.last_seen_at, LocationDwell.left_at,
+               LocationDwell.reads)
+        .where(LocationDwell.asset_id == asset.id, LocationDwell.entered_at < end,
+               func.coalesce(LocationDwell.left_at, LocationDwell.last_seen_at) >= start)
+        .order_by(LocationDwell.entered_at).limit(limit)
+    ).all()
+    reads = db.session.execute(
+        select(LocationRead.read_at, LocationRead.location, LocationRead.event_type)
+        .where(LocationRead.asset_id == asset.id, LocationRead.read_at.between(start, end))
+        .order_by(LocationRead.read_at).limit(limit + 1)
+    ).all()
+
+    return jsonify({
+        'asset_id': asset.asset_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'daily': [{key: _json_value(value) for key, value in row._asdict().items()} for row in daily],
+        'dwells': [{key: _json_value(value) for key, value in row._asdict().items()} for row in dwells],
+        'reads': [{key: _json_value(value) for key, value in row._asdict().items()} for row in reads[:limit]],
+        'reads_truncated': len(reads) > limit
+    })
+
+@app.route('/api/location_history/compactor')
+@login_required
+def location_compactor_status():
+    """Report location history compaction counters"""
+    return jsonify({'enabled': app.config['LOCATION_COMPACT_ENABLED'],
+                    'interval_seconds': location_compactor.interval, **location_compactor.stats})
+
+@app.route('/api/location_history/compact', methods=['POST'])
+@login_required
+def run_location_compaction():
+    """Compact location history now instead of waiting for the next interval"""
+    reads, dwells = location_compactor.compact()
+    return jsonify({'success': True, 'reads_compacted': reads, 'dwells_summarised': dwells,
+                    **location_compactor.stats})
+
+def _movement_days():
+    """(first day, last day) from ?start=&end= dates or the ?days= (default 7) ending today, or None"""
+    try:
+        last_day = date.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow().date()
+        first_day = date.fromisoformat(request.args['start']) if request.args.get('start') else \
+            last_day - timedelta(days=max(request.args.get('days', 7, type=int), 1) - 1)
+    except ValueError:
+        return None
+    return (first_day, last_day) if first_day <= last_day else None
+
+@app.route('/api/movement/flows')
+@login_required
+def movement_flows_api():
+    """Moves between locations as a from/to matrix and Sankey-style links, optionally for one ?category="""
+    window = _movement_days()
+    if window is None:
+        return jsonify({'error': 'Invalid date range'}), 400
+    flows = movement_analytics.flows(*window, category=request.args.get('category'))
+    locations, matrix = flow_matrix(flows)
+    return jsonify({
+        'first_day': window[0].isoformat(),
+        'last_day': window[1].isoformat(),
+        'total_moves': sum(flows.values()),
+        'locations': locations,
+        'matrix': matrix,
+        'links': [{'source': source, 'target': target, 'moves': moves}
+                  for (source, target), moves in sorted(flows.items(), key=lambda item: -item[1])],
+        'ingest': movement_analytics.stats
+    })
+
+@app.route('/api/movement/dwell')
+@login_required
+def movement_dwell_api():
+    """Dwell-time count, mean and percentiles per category and location (?by=location pools categories)"""
+    window = _movement_days()
+    if window is None:
+        return jsonify({'error': 'Invalid date range'}), 400
+    by = request.args.get('by', 'category')
+    if by not in ('category', 'location'):
+        return jsonify({'error': 'by must be category or location'}), 400
+    summaries = movement_analytics.dwell(*window, category=request.args.get('category'),
+                                         location=request.args.get('location'), by_category=by == 'category')
+    return jsonify({
+        'first_day': window[0].isoformat(),
+        'last_day': window[1].isoformat(),
+        'percentiles': list(MovementAnalytics.PERCENTILES),
+        'dwell': [{'category': category, 'location': location, **summary}
+                  for (category, location), summary in sorted(summaries.items(), key=lambda item: (item[0][0] or '', item[0][1]))]
+    })
+
+@app.route('/api/alerts/sweeper')
+@login_required
+def alert_sweeper_status():
+    """Report alert sweep counters and durations"""
+    return jsonify({'enabled': app.config['ALERT_SWEEP_ENABLED'],
+                    'interval_seconds': alert_sweeper.interval, **alert_sweeper.stats})
+
+@app.route('/api/alerts/sweep', methods=['POST'])
+@login_required
+def run_alert_sweep():
+    """Run an alert sweep now instead of waiting for the next interval"""
+    raised = alert_sweeper.sweep()
+    return jsonify({'success': True, 'raised': raised, **alert_sweeper.stats})
+
+@app.route('/api/fleet/summary')
+@login_required
+def fleet_summary():
+    """Fleet-wide counts per status, category, location and ownership, plus idle assets"""
+    snapshot = fleet_snapshot()
+    now = time.time()
+    return jsonify({
+        'assets': len(snapshot),
+        'version': snapshot.version,
+        'snapshot_bytes': snapshot.nbytes(),
+        'load_seconds': round(snapshot.load_seconds, 4),
+        'counts': {column: {value or 'Unknown': count for value, count in snapshot.count_by(column).items()}
+                   for column in FleetSnapshot.STRING_COLUMNS},
+        'idle': {f'{days}d': len(snapshot.older_than('last_usage', now - days * 86400)) for days in (7, 30, 90)}
+    })
+
+@app.route('/api/fleet/at')
+@login_required
+def fleet_at():
+    """State of every asset at ?time= (status, location, open usage), rebuilt from checkpoints and the event log.
+
+    Narrow with ?asset_id=, ?status= and ?location=; page with ?limit= and
+    ?after= (asset primary key). Counts cover every matching asset.
+    """
+    try:
+        when = parse_event_time(request.args['time'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'time must be an ISO-8601 timestamp'}), 400
+    try:
+        limit = min(int(request.args.get('limit', app.config['API_PAGE_MAX'])), app.config['API_PAGE_MAX'])
+        after = int(request.args.get('after', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and after must be integers'}), 400
+    try:
+        states, checkpoint, replayed = fleet_history.state_at(when)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+
+    wanted = {name: request.args[name] for name in ('asset_id', 'status', 'location') if request.args.get(name)}
+    fields = ('asset_id', 'status', 'location', 'usage_id', 'usage_status')
+    matching = []
+    for asset_pk in sorted(states):
+        row = dict(zip(fields, states[asset_pk]))
+        if all(row[name] == value for name, value in wanted.items()):
+            matching.append({'id': asset_pk, **row})
+    page = [row for row in matching if row['id'] > after][:limit]
+
+    return jsonify({
+        'time': when.isoformat(),
+        'checkpoint': {'taken_at': checkpoint.taken_at.isoformat(), 'last_event_id': checkpoint.last_event_id},
+        'events_replayed': replayed,
+        'total': len(matching),
+        'counts': {name: Counter(row[name] or 'Unknown' for row in matching) for name in ('status', 'location')},
+        'assets': page,
+        'next_after': page[-1]['id'] if page and page[-1] is not matching[-1] else None
+    })
+
+@app.route('/api/fleet/checkpoints', methods=['GET', 'POST'])
+@login_required
+def fleet_checkpoints():
+    """List checkpoints; POST takes one now"""
+    if request.method == 'POST':
+        fleet_history.checkpoint()
+    checkpoints = db.session.execute(
+        select(FleetCheckpoint.taken_at, FleetCheckpoint.last_event_id, FleetCheckpoint.asset_count,
+               func.length(FleetCheckpoint.payload))
+        .order_by(FleetCheckpoint.taken_at.desc()).limit(100)
+    ).all()
+    return jsonify({
+        'enabled': app.config['FLEET_CHECKPOINT_ENABLED'],
+        'stats': fleet_history.stats,
+        'checkpoints': [{'taken_at': taken_at.isoformat(), 'last_event_id': last_event_id, 'assets': assets,
+                         'bytes': size} for taken_at, last_event_id, assets, size in checkpoints]
+    })
+
+@app.route('/api/utilization')
+@login_required
+def utilization_api():
+    """Busy-time utilization for ?days= (default 30) or ?start=&end=, ?by=category|department|asset.
+
+    by=asset lists the least-utilized assets that were used at all first,
+    up to ?limit=; assets with no usage in the window are counted in
+    idle_assets instead.
+    """
+    try:
+        end = parse_event_time(request.args['end']) if request.args.get('end') else \
+            datetime.utcnow().replace(second=0, microsecond=0)
+        start = parse_event_time(request.args['start']) if request.args.get('start') else \
+            end - timedelta(days=request.args.get('days', 30, type=int))
+    except ValueError:
+        return jsonify({'error': 'Invalid timestamp'}), 400
+    if end <= start:
+        return jsonify({'error': 'end must be after start'}), 400
+    by = request.args.get('by', 'category')
+    if by not in ('category', 'department', 'asset'):
+        return jsonify({'error': 'by must be category, department or asset'}), 400
+
+    report = utilization_engine.report(start, end)
+    result = {
+        'window_start': start.isoformat(),
+        'window_end': end.isoformat(),
+        'intervals': report.intervals,
+        'compute_seconds': round(report.compute_seconds, 4),
+        'utilization': report.utilization,
+        'idle_assets': max(sum(stats['assets'] for stats in report.categories.values()) - len(report.assets), 0)
+    }
+    if by == 'category':
+        result['categories'] = report.categories
+    elif by == 'department':
+        result['departments'] = report.departments
+    else:
+        limit = min(request.args.get('limit', 100, type=int), app.config['API_PAGE_MAX'])
+        ranked = sorted(report.assets.items(), key=lambda item: (item[1]['utilization'], item[0]))[:limit]
+        tags = dict(db.session.execute(
+            select(Asset.id, Asset.asset_id).where(Asset.id.in_([asset_pk for asset_pk, _ in ranked]))
+        ).all()) if ranked else {}
+        result['assets'] = [{'id': asset_pk, 'asset_id': tags.get(asset_pk), **stats} for asset_pk, stats in ranked]
+    return jsonify(result)
+
+@app.route('/api/rfid/location_mismatch')
+@login_required
+def location_mismatch_status():
+    """Report location-mismatch rule counters"""
+    return jsonify(location_mismatch.snapshot_stats())
+
+def _arg_set(name):
+    values = {value.strip() for value in request.args.get(name, '').split(',') if value.strip()}
+    return values or None
+
+def _asset_event_stream(subscription, backlog, heartbeat):
+    try:
+        yield 'retry: 3000\n\n'
+        if backlog is None:
+            yield 'event: resync\ndata: {}\n\n'
+        elif backlog:
+            yield ''.join(backlog)
+        while True:
+            frames, overflowed = subscription.drain(heartbeat)
+            if overflowed:
+                yield 'event: resync\ndata: {}\n\n'
+            if frames:
+                yield ''.join(frames)
+            elif not overflowed:
+                yield ': keepalive\n\n'
+    finally:
+        asset_events.unsubscribe(subscription)
+
+@app.route('/api/assets/stream')
+@login_required
+def asset_stream():
+    """Server-Sent Events feed of asset status and location changes.
+
+    Filter with ?department= (matches the old or new location), ?category=
+    and ?asset_id=, each comma-separated. Event ids are change sequence
+    numbers, so a reconnecting EventSource resumes from Last-Event-ID; a
+    resync event means changes were missed and the page should reload.
+    """
+    # HEAD would take a client slot for a body that is never sent
+    if request.method != 'GET':
+        return jsonify({'error': 'Use GET'}), 405, {'Allow': 'GET'}
+    subscription = asset_events.subscribe(departments=_arg_set('department'), categories=_arg_set('category'),
+                                          asset_ids=_arg_set('asset_id'))
+    if subscription is None:
+        return jsonify({'error': 'Too many live clients'}), 503, {'Retry-After': '30'}
+    asset_events.start(app)
+
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        backlog = asset_events.replay(int(since), subscription) if since else []
+    except ValueError:
+        backlog = None
+    except Exception:
+        asset_events.unsubscribe(subscription)
+        raise
+    # The stream outlives the request; hand its pooled connection back now
+    db.session.remove()
+    response = Response(_asset_event_stream(subscription, backlog, app.config['SSE_HEARTBEAT_SECONDS']),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # The generator's finally never runs if the body is not iterated (client gone before the first chunk)
+    response.call_on_close(lambda: asset_events.unsubscribe(subscription))
+    return response
+
+@app.route('/api/assets/stream/stats')
+@login_required
+def asset_stream_stats():
+    return jsonify(asset_events.snapshot_stats())
+
+@app.route('/api/db/queries')
+@login_required
+def db_query_stats():
+    """SQL statements per request by endpoint, plus user cache counters"""
+    return jsonify({'endpoints': query_stats.snapshot(), 'user_cache': user_cache.snapshot_stats()})
+
+@app.route('/api/fleet/cache')
+@login_required
+def fleet_cache_status():
+    """Report fleet state cache size, version and hit counters"""
+    return jsonify(fleet_cache.snapshot_stats())
+
+@app.route('/api/rfid/suppression')
+@login_required
+def rfid_suppression_status():
+    """Report duplicate-read suppression counters for sizing the window"""
+    return jsonify(rfid_suppressor.stats())
 
 @app.route('/scan_asset', methods=['GET', 'POST'])
 @login_required
@@ -320,7 +4028,9 @@ def initiate_usage():
     patient_id = request.form.get('patient_id')
     reason = request.form.get('reason')
     
-    asset = Asset.query.filter_by(asset_id=asset_id).first()
+    # Unknown tags are turned away from the cache; known ones are loaded by primary key
+    state = fleet_cache.get(asset_id) if asset_id else None
+    asset = db.session.get(Asset, state.id) if state else None
     
     if asset and asset.status == 'available':
         # Create new usage
@@ -330,18 +4040,20 @@ def initiate_usage():
             expected_duration=int(expected_duration),
             patient_id=patient_id,
             reason=reason,
-            department=current_user.department
+            department=current_user.department,
+            start_time=datetime.utcnow()
         )
         
         # Update asset status
         asset.status = 'in-use'
-        asset.last_usage = datetime.utcnow()
+        asset.last_usage = usage.start_time
         
         db.session.add(usage)
+        record_usage_started(usage, asset)
         db.session.commit()
         
         flash(f'Usage started for {asset.name}')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('asset_management_dashboard'))
     
     flash('Unable to start usage')
     return redirect(url_for('scan_asset'))
@@ -352,66 +4064,81 @@ def end_usage(usage_id):
     usage = AssetUsage.query.get_or_404(usage_id)
     asset = Asset.query.get(usage.asset_id)
     
-    if usage.status == 'active':
+    if usage.status in OPEN_USAGE_STATUSES:
+        already_alerted = usage.status == 'overdue'
         usage.end_time = datetime.utcnow()
         usage.status = 'completed'
         
         # Update asset status
         asset.status = 'available'
+        record_usage_ended(usage, asset)
         
-        # Check for overuse
+        # Check for overuse; overdue usages were alerted on when they crossed the limit
         duration = (usage.end_time - usage.start_time).total_seconds() / 3600
         atlas_info = ATLAS_OF_ASSETS.get(asset.category, {})
         max_use = atlas_info.get('max_continuous_use', 8)
         
-        if duration > max_use:
-            alert = Alert(
-                asset_id=asset.id,
-                alert_type='overuse',
-                message=f'Asset {asset.name} was used for {duration:.1f} hours (max: {max_use})',
-                severity='medium'
-            )
-            db.session.add(alert)
+        if duration > max_use and not already_alerted:
+            raise_alerts([{
+                'asset_id': asset.id,
+                'alert_type': 'overuse',
+                'message': f'Asset {asset.name} was used for {duration:.1f} hours (max: {max_use})',
+                'severity': 'medium'
+            }])
         
         db.session.commit()
         flash(f'Usage ended for {asset.name}')
     
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('asset_management_dashboard'))
 
 @app.route('/reports')
 @login_required
 def reports():
-    # Generate utilization report with realistic demo data
-    assets = Asset.query.all()
-    usage_records = AssetUsage.query.all()
-    
-    # Generate realistic department utilization data
+    # Utilization from the hourly usage rollups over the selected window
+    window_days = request.args.get('days', 30, type=int)
+    window_start = datetime.utcnow() - timedelta(days=window_days)
+
+    dept_rows = db.session.query(
+        UsageRollup.department,
+        func.sum(UsageRollup.usages_started),
+        func.sum(UsageRollup.usages_completed),
+        func.sum(UsageRollup.busy_seconds)
+    ).filter(UsageRollup.bucket_start >= window_start).group_by(UsageRollup.department).all()
+
     dept_utilization = {
-        'ICU': {'usage_count': 45, 'hours': 180.5},
-        'ER': {'usage_count': 32, 'hours': 128.2},
-        'OR': {'usage_count': 28, 'hours': 112.8},
-        'Rehab': {'usage_count': 18, 'hours': 72.4},
-        'Storage': {'usage_count': 5, 'hours': 8.2}
+        department: {'usage_count': int(started or 0), 'hours': round((seconds or 0) / 3600, 1)}
+        for department, started, completed, seconds in dept_rows
     }
-    
-    # Generate realistic asset category utilization
+
+    # Asset counts and current in-use counts per category
+    snapshot = fleet_snapshot()
+    in_use = snapshot.count_by('category', status='in-use')
     category_utilization = {
-        'wheelchair': {'count': 25, 'in_use': 18},
-        'stretcher_gurney': {'count': 12, 'in_use': 8},
-        'portable_xray': {'count': 6, 'in_use': 4},
-        'portable_ultrasound': {'count': 8, 'in_use': 6},
-        'mobile_ecg': {'count': 10, 'in_use': 7},
-        'iv_pole_wheeled': {'count': 30, 'in_use': 22},
-        'mobile_vital_signs': {'count': 15, 'in_use': 12},
-        'defibrillator_cart': {'count': 8, 'in_use': 2},
-        'infusion_pump_stand': {'count': 20, 'in_use': 16},
-        'crash_cart': {'count': 10, 'in_use': 1},
-        'portable_ventilator': {'count': 6, 'in_use': 4},
-        'anesthesia_cart': {'count': 4, 'in_use': 3}
+        category: {'count': count, 'in_use': in_use.get(category, 0)}
+        for category, count in snapshot.count_by('category').items()
     }
-    
-    # Realistic average usage duration
-    avg_usage_duration = 4.2
+
+    # Busy-time utilization and concurrency peaks from a sweep over the window's usage intervals
+    window_end = datetime.utcnow().replace(second=0, microsecond=0)
+    utilization = utilization_engine.report(window_end - timedelta(days=window_days), window_end)
+    for department, stats in utilization.departments.items():
+        dept_utilization.setdefault(department, {'usage_count': 0, 'hours': 0.0}).update(
+            avg_concurrent=stats['avg_concurrent'], peak_concurrent=stats['peak_concurrent'])
+    for category, stats in utilization.categories.items():
+        category_utilization.setdefault(category, {'count': stats['assets'], 'in_use': 0}).update(
+            utilization=stats['utilization'], peak_concurrent=stats['peak_concurrent'])
+    utilization_rate = utilization.utilization
+
+    # Equipment flow between reader locations and stay lengths, from the movement rollups
+    movement_days = (window_end.date() - timedelta(days=window_days - 1), window_end.date())
+    flow_locations, flow_counts = flow_matrix(movement_analytics.flows(*movement_days))
+    flow_peak = max(map(max, flow_counts), default=0)
+    dwell_by_location = movement_analytics.dwell(*movement_days, by_category=False)
+
+    # Average duration of usages completed in the window
+    completed_usages = sum(int(completed or 0) for _, _, completed, _ in dept_rows)
+    busy_seconds = sum(seconds or 0 for _, _, _, seconds in dept_rows)
+    avg_usage_duration = busy_seconds / completed_usages / 3600 if completed_usages else 0.0
     
 
     
@@ -475,31 +4202,23 @@ def reports():
         }
     }
     
-    # Calculate realistic utilization rate based on asset_stats
-    total_assets = asset_stats['total_assets']  # 70,000 total assets
-    active_use_assets = asset_stats['active_use']  # 30,700 assets in active use
-    utilization_rate = (active_use_assets / total_assets * 100) if total_assets > 0 else 43.9
-    
-    # Generate maintenance data
+    total_assets = len(snapshot)
+
+    # Maintenance status from asset statuses and the due-date index
+    schedule = maintenance_schedule.refresh()
+    scheduled_maintenance = schedule.windows()
+    status_counts = snapshot.count_by('status')
+    under_maintenance = status_counts.get('maintenance', 0)
+    out_of_service = status_counts.get('retired', 0)
+    due_soon = scheduled_maintenance['Overdue'] + scheduled_maintenance['This Week']
     maintenance_data = {
         'status_overview': {
-            'Operational': 45600,
-            'Under Maintenance': 8500,
-            'Scheduled Maintenance': 5150,
-            'Out of Service': 1750
-        },
-        'scheduled_maintenance': {
-            'This Week': 1250,
-            'Next Week': 2100,
-            'This Month': 3800,
-            'Next Month': 4200
+            'Operational': max(len(snapshot) - under_maintenance - out_of_service - due_soon, 0),
+            'Under Maintenance': under_maintenance,
+            'Scheduled Maintenance': due_soon,
+            'Out of Service': out_of_service
         },
-        'maintenance_alerts': {
-            'Critical': 850,
-            'High Priority': 1250,
-            'Medium Priority': 2100,
-            'Low Priority': 3450
-        }
+        'scheduled_maintenance': scheduled_maintenance
     }
     
     # Generate cost optimization data for capital budget decisions
@@ -651,7 +4370,12 @@ def reports():
     return render_template('reports.html', 
                          dept_utilization=dept_utilization,
                          category_utilization=category_utilization,
+                         window_days=window_days,
                          utilization_rate=utilization_rate,
+                         flow_locations=flow_locations,
+                         flow_counts=flow_counts,
+                         flow_peak=flow_peak,
+                         dwell_by_location=dwell_by_location,
                          avg_usage_duration=avg_usage_duration,
                          total_assets=total_assets,
                          rental_roi_data=rental_roi_data,
@@ -660,22 +4384,117 @@ def reports():
                          maintenance_data=maintenance_data,
                          cost_optimization_data=cost_optimization_data) 
 
+# Columns /api/assets can project; qr_code is legacy and never exported
+ASSET_API_FIELDS = tuple(column.key for column in Asset.__table__.columns if column.key != 'qr_code')
+ASSET_API_DEFAULT_FIELDS = ('id', 'asset_id', 'name', 'status', 'location')
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+def _asset_api_fields(args):
+    fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+    if not fields:
+        return list(ASSET_API_DEFAULT_FIELDS)
+    unknown = [field for field in fields if field not in ASSET_API_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
 @app.route('/api/assets')
 @login_required
 def api_assets():
-    assets = Asset.query.all()
-    return jsonify([{
-        'id': asset.id,
-        'asset_id': asset.asset_id,
-        'name': asset.name,
-        'status': asset.status,
-        'location': asset.location
-    } for asset in assets])
+    """List assets, selecting only the requested columns
+
+    ?fields=a,b,c   project columns (default id, asset_id, name, status, location)
+    ?limit=N        page size (default API_PAGE_DEFAULT, at most API_PAGE_MAX); pages are by id and
+                    the next page's cursor is in X-Next-Cursor and the Link header
+    ?after=ID       resume after the given cursor
+    ?format=ndjson  stream every matching asset, one JSON object per line (the only full dump)
+    Filters: status, ownership, category, location, scanned=0|1
+    """
+    try:
+        fields = _asset_api_fields(request.args)
+        limit = request.args.get('limit', app.config['API_PAGE_DEFAULT'], type=int)
+        after = request.args.get('after', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Always select the id so the cursor can be derived, even when it is not projected
+    columns = [Asset.id] + [getattr(Asset, field) for field in fields]
+    query = filtered_asset_query(request.args).with_entities(*columns).order_by(Asset.id)
+    if after is not None:
+        query = query.filter(Asset.id > after)
+
+    if request.args.get('format') == 'ndjson':
+        statement = query.statement.execution_options(yield_per=app.config['API_STREAM_BATCH_SIZE'])
+
+        def generate():
+            # yield_per streams through a server-side cursor where the driver supports one
+            for row in db.session.execute(statement):
+                yield json.dumps({field: _json_value(value) for field, value in zip(fields, row[1:])},
+                                 separators=(',', ':')) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    limit = min(max(limit, 1), app.config['API_PAGE_MAX'])
+    rows = query.limit(limit + 1).all()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    rows = rows[:limit]
+
+    response = jsonify([{field: _json_value(value) for field, value in zip(fields, row[1:])} for row in rows])
+    if next_cursor is not None:
+        next_args = request.args.to_dict()
+        next_args['after'] = next_cursor
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+        response.headers['Link'] = f'<{url_for("api_assets", **next_args)}>; rel="next"'
+    return response
+
+@app.route('/api/assets/changes')
+@login_required
+def api_asset_changes():
+    """Assets changed or deleted after a change sequence number
+
+    Start with since=0 for a full sync, then pass the returned next_since on
+    each poll. Changes come back in sequence order, at most `limit` at a
+    time; keep polling while has_more is true.
+    """
+    try:
+        fields = _asset_api_fields(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    since = request.args.get('since', 0, type=int)
+    limit = min(max(request.args.get('limit', app.config['API_PAGE_MAX'], type=int), 1), app.config['API_PAGE_MAX'])
+
+    changed = db.session.query(Asset.change_seq, *[getattr(Asset, field) for field in fields]) \
+        .filter(Asset.change_seq > since).order_by(Asset.change_seq).limit(limit + 1).all()
+    deleted = db.session.query(AssetTombstone.change_seq, AssetTombstone.asset_pk, AssetTombstone.asset_id) \
+        .filter(AssetTombstone.change_seq > since).order_by(AssetTombstone.change_seq).limit(limit + 1).all()
+
+    merged = sorted([(row[0], 'changed', row) for row in changed] + [(row[0], 'deleted', row) for row in deleted])
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    changes, removals = [], []
+    for seq, kind, row in merged:
+        if kind == 'changed':
+            item = {field: _json_value(value) for field, value in zip(fields, row[1:])}
+            item['change_seq'] = seq
+            changes.append(item)
+        else:
+            removals.append({'id': row[1], 'asset_id': row[2], 'change_seq': seq})
+
+    return jsonify({
+        'since': since,
+        'next_since': merged[-1][0] if merged else since,
+        'has_more': has_more,
+        'changes': changes,
+        'deleted': removals
+    })
 
 @app.route('/api/scan/<asset_id>')
 @login_required
 def api_scan_asset(asset_id):
-    asset = Asset.query.filter_by(asset_id=asset_id).first()
+    asset = fleet_cache.get(asset_id)
     if asset:
         atlas_info = ATLAS_OF_ASSETS.get(asset.category, {})
         return jsonify({
@@ -691,6 +4510,66 @@ def api_scan_asset(asset_id):
         })
     return jsonify({'found': False})
 
+@app.route('/qr/<asset_id>.png')
+@login_required
+def asset_qr_png(asset_id):
+    """Serve an asset's QR code, rendering it on first request"""
+    # Checked on every request so a deleted asset's cached image is never served
+    if fleet_cache.get(asset_id) is None:
+        abort(404)
+    cached = qr_cache.get(asset_id)
+    if cached is None:
+        png = render_qr_png(asset_id)
+        cached = qr_cache.put(asset_id, png), png
+
+    etag, png = cached
+    response = app.response_class(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response.make_conditional(request)
+
+@app.route('/labels', methods=['POST'])
+@login_required
+def bulk_labels():
+    """Render printable QR label sheets for a list of assets as PDF or a ZIP of PNGs"""
+    data = request.get_json(silent=True) or {}
+    asset_ids = data.get('asset_ids') or request.form.getlist('asset_ids')
+    output_format = (data.get('format') or request.form.get('format') or 'pdf').lower()
+
+    if not asset_ids or output_format not in ('pdf', 'png'):
+        return jsonify({'success': False, 'error': 'asset_ids and a format of pdf or png are required'}), 400
+    if len(asset_ids) > app.config['LABEL_JOB_MAX']:
+        return jsonify({'success': False, 'error': f"At most {app.config['LABEL_JOB_MAX']} labels per job"}), 413
+
+    names = {}
+    unique_ids = list(dict.fromkeys(asset_ids))
+    for chunk in _chunked(unique_ids):
+        names.update(db.session.query(Asset.asset_id, Asset.name).filter(Asset.asset_id.in_(chunk)))
+    missing = [asset_id for asset_id in unique_ids if asset_id not in names]
+    if missing:
+        return jsonify({'success': False, 'error': 'Assets not found', 'missing': missing}), 404
+
+    labels = [(asset_id, names[asset_id]) for asset_id in asset_ids]
+    sheet_count = -(-len(labels) // (LABEL_GRID[0] * LABEL_GRID[1]))
+    if output_format == 'pdf':
+        encode, mimetype, filename = stream_label_pdf, 'application/pdf', 'asset_labels.pdf'
+    else:
+        encode, mimetype, filename = stream_label_zip, 'application/zip', 'asset_labels.zip'
+
+    def generate():
+        # Sheets are rendered a chunk at a time as the client reads, so memory does not grow with the job
+        started = time.perf_counter()
+        yield from encode(label_sheets(labels))
+        elapsed = time.perf_counter() - started
+        app.logger.info('Rendered %d labels on %d sheets in %.2fs (%.0f labels/sec)',
+                        len(labels), sheet_count, elapsed, len(labels) / elapsed if elapsed else 0.0)
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Labels-Rendered'] = str(len(labels))
+    response.headers['X-Label-Sheets'] = str(sheet_count)
+    return response
+
 @app.route('/register_asset', methods=['GET', 'POST'])
 @login_required
 def register_asset():
@@ -730,8 +4609,7 @@ def register_asset():
                 vendor=vendor if ownership_type == 'rental' else None,
                 rental_rate=rental_rate if ownership_type == 'rental' else None,
                 purchase_date=purchase_date,
-                expected_lifespan=60,  # Default 5 years
-                qr_code=generate_qr_code(asset_id)
+                expected_lifespan=60  # Default 5 years
             )
             
             db.session.add(new_asset)
@@ -782,17 +4660,131 @@ def delete_rental(asset_id):
     
     return redirect(url_for('register_asset'))
 
+# Keyset pagination for asset tables
+ASSET_FILTERS = ('status', 'ownership', 'category', 'location')
+ASSET_SORTS = ('asset_id', 'name', 'category', 'location', 'status', 'last_usage')
+ASSET_PAGE_FIELDS = ('id', 'asset_id', 'name', 'category', 'status', 'ownership', 'location', 'vendor', 'last_usage')
+
+def _asset_sort_expression(sort):
+    column = getattr(Asset, sort)
+    if not column.nullable:
+        return column
+    # Coalesce NULLs so the keyset comparison stays total
+    return func.coalesce(column, datetime(1970, 1, 1) if sort == 'last_usage' else '')
+
+def _encode_cursor(sort, value, row_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _decode_cursor(cursor, sort):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, row_id = json.loads(raw)
+        if sort == 'last_usage':
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort:
+        raise ValueError('Cursor does not match the requested sort')
+    return value, int(row_id)
+
+def filtered_asset_query(args):
+    """Apply the status/ownership/category/location and scanned filters from request args"""
+    query = Asset.query
+    for name in ASSET_FILTERS:
+        if args.get(name):
+            query = query.filter(getattr(Asset, name) == args[name])
+    if args.get('scanned') == '1':
+        query = query.filter(or_(Asset.status.is_(None), Asset.status != 'unassociated'))
+    elif args.get('scanned') == '0':
+        query = query.filter(Asset.status == 'unassociated')
+    return query
+
+def paginate_assets(args, default_limit=50, max_limit=500):
+    """Return one keyset-paginated page of assets plus the cursor for the next page"""
+    sort = args.get('sort', 'asset_id')
+    if sort not in ASSET_SORTS:
+        raise ValueError(f'sort must be one of {", ".join(ASSET_SORTS)}')
+    descending = args.get('order') == 'desc'
+    limit = min(max(args.get('limit', default_limit, type=int) or default_limit, 1), max_limit)
+
+    query = filtered_asset_query(args)
+    total = query.order_by(None).count()
+
+    sort_expression = _asset_sort_expression(sort)
+    key = tuple_(sort_expression, Asset.id)
+    if args.get('after'):
+        value, row_id = _decode_cursor(args['after'], sort)
+        query = query.filter(key < tuple_(value, row_id) if descending else key > tuple_(value, row_id))
+    if descending:
+        query = query.order_by(sort_expression.desc(), Asset.id.desc())
+    else:
+        query = query.order_by(sort_expression, Asset.id)
+
+    rows = query.add_columns(sort_expression).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_asset, last_value = rows[-1]
+        next_cursor = _encode_cursor(sort, last_value, last_asset.id)
+    return {'items': [asset for asset, _ in rows], 'next_cursor': next_cursor, 'total': total}
+
+def asset_facet_counts(scanned=None):
+    """Counts per filter value over the rows the table lists, taken from the fleet snapshot.
+
+    scanned is the table's ?scanned= base filter, as in filtered_asset_query:
+    '1' leaves out unassociated assets, '0' counts only them, anything else
+    counts the whole fleet.
+    """
+    snapshot = fleet_snapshot()
+    counts = {}
+    for name in ASSET_FILTERS:
+        if scanned == '1':
+            facet = Counter(snapshot.count_by(name))
+            facet.subtract(snapshot.count_by(name, status='unassociated'))
+        elif scanned == '0':
+            facet = snapshot.count_by(name, status='unassociated')
+        else:
+            facet = snapshot.count_by(name)
+        counts[name] = {value or 'Unknown': count for value, count in facet.items() if count > 0}
+    return counts
+
+@app.route('/api/dashboard/assets')
+@login_required
+def api_dashboard_assets():
+    """JSON page of the dashboard asset table for client-side paging"""
+    try:
+        page = paginate_assets(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    payload = {
+        'assets': [{field: _json_value(getattr(asset, field)) for field in ASSET_PAGE_FIELDS}
+                   for asset in page['items']],
+        'next_cursor': page['next_cursor'],
+        'total': page['total']
+    }
+    if request.args.get('counts') == '1':
+        payload['counts'] = asset_facet_counts(request.args.get('scanned'))
+    return jsonify(payload)
+
 @app.route('/asset_management_dashboard')
 @login_required
 def asset_management_dashboard():
     """Complete Asset Management Dashboard with workflow tracking"""
     
-    # Get all assets from database
-    assets = Asset.query.all()
-    
-    # Separate scanned and unscanned assets
-    scanned_assets = [asset for asset in assets if asset.status != 'unassociated']
-    unscanned_assets = [asset for asset in assets if asset.status == 'unassociated']
+    # Current page of scanned assets, filtered and sorted in the database
+    table_args = request.args.copy()
+    table_args.setdefault('scanned', '1')
+    try:
+        asset_page = paginate_assets(table_args)
+    except ValueError as e:
+        flash(str(e), 'error')
+        asset_page = paginate_assets({'scanned': '1'})
+    scanned_assets = asset_page['items']
+    asset_counts = asset_facet_counts(table_args['scanned'])
     
     # Define asset_stats (same as in reports route)
     asset_stats = {
@@ -1284,7 +5276,9 @@ def asset_management_dashboard():
     return render_template('asset_management_dashboard.html',
                          asset_stats=asset_stats,
                          scanned_assets=scanned_assets,
-                         unscanned_assets=unscanned_assets,
+                         asset_page=asset_page,
+                         asset_counts=asset_counts,
+                         asset_filters=table_args,
                          vendor_stats=vendor_stats,
                          vendor_performance=vendor_performance,
                          department_rental_distribution=department_rental_distribution,
@@ -1335,6 +5329,7 @@ def return_rental(rental_id):
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        upgrade_schema()
         
         # Create sample data if database is empty
         if not User.query.first():
@@ -1427,9 +5422,10 @@ if __name__ == '__main__':
             ]
             
             for asset in sample_assets:
-                asset.qr_code = generate_qr_code(asset.asset_id)
                 db.session.add(asset)
             
             db.session.commit()
+
+        fleet_cache.warm()
     
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
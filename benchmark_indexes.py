@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Index Benchmark for Asset Tracking System
+Times the hot query paths on a synthetic database before and after
+upgrade_schema() adds the composite indexes
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from app import db, upgrade_schema
+
+DEPARTMENTS = ["ICU", "ER", "OR", "Rehab", "Radiology"]
+CATEGORIES = ["wheelchair", "infusion_pump_stand", "portable_ventilator", "mobile_ecg", "crash_cart"]
+
+HOT_QUERIES = {
+    "rfid exit: open usage for asset": (
+        "SELECT id FROM asset_usage WHERE asset_id = :asset AND status = 'active' LIMIT 1"
+    ),
+    "asset_detail: usage history": (
+        "SELECT id, start_time FROM asset_usage WHERE asset_id = :asset "
+        "ORDER BY start_time DESC LIMIT 10"
+    ),
+    "register_asset: unassociated rentals": (
+        "SELECT id FROM asset WHERE ownership = 'rental' AND status = 'unassociated'"
+    ),
+    "open alerts": (
+        "SELECT id FROM alert WHERE is_resolved = 0 ORDER BY created_at DESC LIMIT 50"
+    ),
+}
+
+
+def populate(path, asset_count, usage_count, alert_count):
+    """Create the schema without the new indexes and bulk load synthetic rows"""
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(conn)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    now = datetime.utcnow()
+    conn.execute(
+        "INSERT INTO user (id, username, email, password_hash, department, role) "
+        "VALUES (1, 'bench', 'bench@hospital.com', 'x', 'ICU', 'nurse')"
+    )
+    conn.executemany(
+        "INSERT INTO asset (id, asset_id, name, category, status, ownership, location) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"BENCH{i:06d}", f"Bench Asset {i}", random.choice(CATEGORIES),
+             random.choice(["available", "in-use", "maintenance", "unassociated"]),
+             random.choice(["hospital", "hospital", "rental"]), random.choice(DEPARTMENTS))
+            for i in range(1, asset_count + 1)
+        ),
+    )
+
+    def usages():
+        for i in range(usage_count):
+            start = now - timedelta(minutes=random.randint(0, 525600))
+            active = i % 200 == 0
+            yield (random.randint(1, asset_count), 1, start,
+                   None if active else start + timedelta(hours=random.randint(1, 8)),
+                   random.choice(DEPARTMENTS), "active" if active else "completed")
+
+    conn.executemany(
+        "INSERT INTO asset_usage (asset_id, user_id, start_time, end_time, department, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        usages(),
+    )
+    conn.executemany(
+        "INSERT INTO alert (asset_id, alert_type, message, severity, is_resolved, created_at) "
+        "VALUES (?, 'overuse', 'benchmark', 'medium', ?, ?)",
+        (
+            (random.randint(1, asset_count), i % 50 != 0, now - timedelta(minutes=i))
+            for i in range(alert_count)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_queries(engine, asset_count, repeats):
+    """Return average milliseconds per hot query"""
+    timings = {}
+    with engine.connect() as conn:
+        for label, sql in HOT_QUERIES.items():
+            statement = text(sql)
+            started = time.perf_counter()
+            for _ in range(repeats):
+                conn.execute(statement, {"asset": random.randint(1, asset_count)}).fetchall()
+            timings[label] = (time.perf_counter() - started) / repeats * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot queries before and after indexing")
+    parser.add_argument("--usages", type=int, default=1_000_000)
+    parser.add_argument("--assets", type=int, default=70_000)
+    parser.add_argument("--alerts", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print("🏥 Index Benchmark")
+    print("=" * 50)
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    print(f"📦 Loading {args.assets:,} assets, {args.usages:,} usages, {args.alerts:,} alerts...")
+    started = time.perf_counter()
+    populate(path, args.assets, args.usages, args.alerts)
+    print(f"   done in {time.perf_counter() - started:.1f}s")
+
+    engine = create_engine(f"sqlite:///{path}")
+    before = time_queries(engine, args.assets, args.repeats)
+
+    started = time.perf_counter()
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"🔧 upgrade_schema() built indexes in {time.perf_counter() - started:.1f}s")
+    after = time_queries(engine, args.assets, args.repeats)
+
+    print()
+    print(f"{'query':<40}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for label in HOT_QUERIES:
+        speedup = before[label] / after[label] if after[label] else float("inf")
+        print(f"{label:<40}{before[label]:>12.3f}{after[label]:>12.3f}{speedup:>9.0f}x")
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
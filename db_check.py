@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Database Backend Check for Asset Tracking System
+Runs the application's main workflows against a database backend so that
+SQLite and PostgreSQL deployments can be validated offline
+
+Usage:
+    python db_check.py                                   # throwaway SQLite file
+    python db_check.py postgresql://user:pw@localhost/assets_check
+
+The target database must be empty; it is left populated for inspection.
+"""
+
+import os
+import sys
+import tempfile
+import traceback
+from datetime import datetime, timedelta, timezone
+
+if len(sys.argv) > 1:
+    os.environ["DATABASE_URL"] = sys.argv[1]
+else:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "db_check.db")
+
+# Apply reads synchronously so each check sees its own writes
+os.environ["RFID_QUEUE_ENABLED"] = "0"
+os.environ["RFID_DEDUP_WINDOW_SECONDS"] = "0"
+os.environ["ALERT_SWEEP_ENABLED"] = "0"
+os.environ["OVERDUE_SCHEDULER_ENABLED"] = "0"
+os.environ["LOCATION_COMPACT_ENABLED"] = "0"
+os.environ["FLEET_CHECKPOINT_ENABLED"] = "0"
+
+from sqlalchemy import inspect  # noqa: E402
+
+from app import (  # noqa: E402
+    Alert, Asset, AssetTombstone, AssetUsage, FleetHistory, LocationDaily, LocationDwell, LocationRead, OverdueScheduler, UsageRollup, User,
+    app, bulk_insert, db, fleet_history, location_compactor, movement_analytics,
+    generate_password_hash, raise_alerts, rebuild_movement_analytics, rebuild_usage_rollups, upgrade_schema, user_cache
+)
+
+CHECKS = []
+
+
+def check(func):
+    """Register a workflow check"""
+    CHECKS.append(func)
+    return func
+
+
+def asset(asset_id):
+    return Asset.query.filter_by(asset_id=asset_id).one()
+
+
+@check
+def schema(client):
+    db.create_all()
+    upgrade_schema()
+    upgrade_schema()
+    user = User(username="checker", email="checker@hospital.com",
+                password_hash=generate_password_hash("check123"), department="ICU", role="nurse")
+    db.session.add(user)
+    db.session.add_all([
+        Asset(asset_id="CHK001", name="Check Wheelchair", category="wheelchair",
+              ownership="hospital", status="available", location="Storage"),
+        Asset(asset_id="CHK002", name="Check Ventilator", category="portable_ventilator",
+              ownership="hospital", status="available", location="Storage"),
+    ])
+    db.session.commit()
+    assert len(inspect(db.engine).get_indexes("asset_usage")) >= 2
+    fleet_history.checkpoint()
+
+
+@check
+def login(client):
+    response = client.post("/login", data={"username": "checker", "password": "check123"})
+    assert response.status_code == 302, response.status_code
+
+
+@check
+def register_and_associate_rental(client):
+    response = client.post("/register_asset", data={
+        "asset_type": "Infusion Pump Stand", "serial_number": "SN-CHECK-0001",
+        "ownership_type": "rental", "manufacturer": "Check Corp", "vendor": "Check Rentals",
+        "rental_rate": "120", "initial_location": "Storage", "purchase_date": "2024-01-01",
+    })
+    assert response.status_code == 302, response.status_code
+    rental = Asset.query.filter_by(ownership="rental", status="unassociated").one()
+    assert client.get("/register_asset").status_code == 200
+    client.post(f"/associate_rental/{rental.id}")
+    db.session.expire_all()
+    assert db.session.get(Asset, rental.id).status == "available"
+
+
+@check
+def scan_and_list(client):
+    assert client.get("/api/scan/CHK001").get_json()["found"]
+    assert not client.get("/api/scan/MISSING").get_json()["found"]
+    assert len(client.get("/api/assets").get_json()) >= 3
+    app.config["API_PAGE_DEFAULT"], default = 1, app.config["API_PAGE_DEFAULT"]
+    try:
+        unbounded = client.get("/api/assets")
+        assert len(unbounded.get_json()) == 1 and unbounded.headers["X-Next-Cursor"]
+    finally:
+        app.config["API_PAGE_DEFAULT"] = default
+    first = client.get("/api/assets", query_string={"limit": 1, "fields": "asset_id,category"})
+    assert list(first.get_json()[0]) == ["asset_id", "category"]
+    rest = client.get("/api/assets", query_string={"after": first.headers["X-Next-Cursor"]}).get_json()
+    streamed = client.get("/api/assets", query_string={"format": "ndjson"}).get_data(as_text=True)
+    assert len(streamed.splitlines()) == 1 + len(rest) == Asset.query.count()
+
+
+@check
+def qr_images(client):
+    response = client.get("/qr/CHK001.png")
+    assert response.status_code == 200 and response.mimetype == "image/png"
+    assert "immutable" in response.headers["Cache-Control"]
+    etag = response.headers["ETag"]
+    assert client.get("/qr/CHK001.png", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/qr/MISSING.png").status_code == 404
+
+
+@check
+def rfid_batch(client):
+    now = datetime.utcnow()
+    response = client.post("/rfid_events", json=[
+        {"asset_id": "CHK001", "location": "ICU", "event_type": "enter", "timestamp": now.isoformat()},
+        {"asset_id": "CHK001", "location": "Storage", "event_type": "exit",
+         "timestamp": (now + timedelta(hours=1)).isoformat()},
+        {"asset_id": "MISSING", "location": "ICU", "event_type": "enter", "timestamp": now.isoformat()},
+        {"asset_id": ["CHK001"], "location": "ICU", "event_type": "enter", "timestamp": now.isoformat()},
+        {"asset_id": "CHK001", "location": "ICU", "timestamp": now.isoformat()},
+    ])
+    assert response.status_code == 200, response.status_code
+    results = response.get_json()["results"]
+    assert [result.get("outcome") for result in results] == ["usage_started", "usage_ended", None, None, None], results
+    assert [result.get("error") for result in results[2:]] == [
+        "Asset not found", "asset_id is required", "event_type must be enter or exit"], results
+    db.session.expire_all()
+    usage = AssetUsage.query.filter_by(asset_id=asset("CHK001").id).one()
+    assert usage.status == "completed" and usage.user_id is None
+
+
+@check
+def rfid_single_with_timezone(client):
+    stamp = datetime.now(timezone(timedelta(hours=-5))).isoformat()
+    response = client.post("/rfid_event", json={
+        "asset_id": "CHK002", "location": "ER", "event_type": "enter", "timestamp": stamp,
+    })
+    assert response.status_code == 200, response.status_code
+    missing = {"asset_id": "MISSING", "event_type": "enter", "timestamp": stamp}
+    assert client.post("/rfid_event", json=missing).status_code == 404
+    assert client.post("/rfid_event", json={"asset_id": "CHK002", "timestamp": stamp}).status_code == 400
+    db.session.expire_all()
+    assert asset("CHK002").status == "in-use"
+
+
+@check
+def location_mismatch(client):
+    start = datetime.utcnow()
+    stray = [{"asset_id": "CHK002", "location": "ICU", "event_type": "enter",
+              "timestamp": (start + timedelta(seconds=20 * i)).isoformat()} for i in range(4)]
+    client.post("/rfid_events", json=stray[:1] + [dict(stray[1], location="ER")] + stray[2:])
+    assert Alert.query.filter_by(alert_type="location_mismatch").count() == 0
+    client.post("/rfid_events", json=[dict(event, timestamp=(start + timedelta(minutes=5, seconds=20 * i)).isoformat())
+                                      for i, event in enumerate(stray)])
+    assert Alert.query.filter_by(asset_id=asset("CHK002").id, alert_type="location_mismatch").count() == 1
+
+
+@check
+def location_history(client):
+    target = asset("CHK002")
+    reads = LocationRead.query.filter_by(asset_id=target.id).count()
+    assert reads >= 8, reads
+    before = client.get(f"/api/assets/{target.id}/trail", query_string={"at": datetime.utcnow().isoformat()})
+    location_compactor.compact_reads(datetime.utcnow() + timedelta(days=1))
+    assert LocationRead.query.filter_by(asset_id=target.id).count() == 0
+    dwells = LocationDwell.query.filter_by(asset_id=target.id).order_by(LocationDwell.entered_at).all()
+    assert sum(dwell.reads for dwell in dwells) == reads
+    assert [dwell.left_at is None for dwell in dwells].count(True) == 1
+    after = client.get(f"/api/assets/{target.id}/trail", query_string={"at": datetime.utcnow().isoformat()})
+    assert after.get_json()["location"] == before.get_json()["location"] and after.get_json()["tier"] == "dwell"
+    location_compactor.compact_dwells(datetime.utcnow() + timedelta(days=1))
+    assert LocationDwell.query.filter_by(asset_id=target.id).count() == 1
+    assert sum(row.visits for row in LocationDaily.query.filter_by(asset_id=target.id)) == len(dwells) - 1
+    trail = client.get(f"/api/assets/{target.id}/trail",
+                       query_string={"start": (datetime.utcnow() - timedelta(days=2)).isoformat(),
+                                     "end": (datetime.utcnow() + timedelta(days=1)).isoformat()}).get_json()
+    assert trail["daily"] and trail["dwells"] and not trail["reads"]
+
+
+@check
+def movement_flows(client):
+    db.session.add(Asset(asset_id="CHK003", name="Check Crash Cart", category="crash_cart",
+                         ownership="hospital", status="available", location="Storage"))
+    db.session.commit()
+    start = datetime.utcnow()
+    path = [("OR", 0), ("OR", 10), ("ER", 30), ("ER", 40), ("OR", 90), ("ICU", 100)]
+    client.post("/rfid_events", json=[{"asset_id": "CHK003", "location": location, "event_type": "exit",
+                                       "timestamp": (start + timedelta(minutes=minutes)).isoformat()}
+                                      for location, minutes in path])
+    first_day, last_day = (start - timedelta(days=1)).date(), (start + timedelta(days=1)).date()
+    incremental = movement_analytics.flows(first_day, last_day, category="crash_cart")
+    # A full rebuild from the read history lands on the same rollups
+    rebuild_movement_analytics(db.session.connection())
+    assert movement_analytics.flows(first_day, last_day, category="crash_cart") == incremental
+    db.session.rollback()
+    # Older than the stay's last read, so it is skipped
+    client.post("/rfid_event", json={"asset_id": "CHK003", "location": "Rehab", "event_type": "exit",
+                                     "timestamp": (start + timedelta(minutes=20)).isoformat()})
+    window = {"category": "crash_cart", "start": first_day.isoformat(), "end": last_day.isoformat()}
+    flows = client.get("/api/movement/flows", query_string=window).get_json()
+    links = {(link["source"], link["target"]): link["moves"] for link in flows["links"]}
+    assert links == {("OR", "ER"): 1, ("ER", "OR"): 1, ("OR", "ICU"): 1}, links
+    assert flows["matrix"][flows["locations"].index("OR")][flows["locations"].index("ER")] == 1
+    stays = {row["location"]: row for row in client.get("/api/movement/dwell", query_string=window).get_json()["dwell"]}
+    assert stays["OR"]["visits"] == 2 and stays["OR"]["mean_minutes"] == 20.0, stays
+    assert stays["ER"]["visits"] == 1 and abs(stays["ER"]["p50_minutes"] - 60) <= 12, stays
+
+
+@check
+def manual_usage(client):
+    rental = Asset.query.filter_by(ownership="rental", status="available").one()
+    client.post("/initiate_usage", data={
+        "asset_id": rental.asset_id, "expected_duration": "2", "patient_id": "P-1", "reason": "check",
+    })
+    usage = AssetUsage.query.filter_by(asset_id=rental.id, status="active").one()
+    client.post(f"/end_usage/{usage.id}")
+    db.session.expire_all()
+    assert db.session.get(AssetUsage, usage.id).status == "completed"
+    assert client.get(f"/asset/{rental.id}").status_code == 200
+
+
+@check
+def overdue_usage(client):
+    client.post("/initiate_usage", data={
+        "asset_id": "CHK001", "expected_duration": "1", "patient_id": "P-2", "reason": "check",
+    })
+    usage = AssetUsage.query.filter_by(asset_id=asset("CHK001").id, status="active").one()
+    scheduler = OverdueScheduler()
+    scheduler.rebuild()
+    assert scheduler.fire_due(datetime.utcnow()) == 0
+    assert scheduler.fire_due(datetime.utcnow() + timedelta(hours=1, minutes=1)) >= 1
+    db.session.expire_all()
+    assert db.session.get(AssetUsage, usage.id).status == "overdue"
+    client.post(f"/end_usage/{usage.id}")
+    db.session.expire_all()
+    assert db.session.get(AssetUsage, usage.id).status == "completed"
+    assert Alert.query.filter_by(asset_id=usage.asset_id, alert_type="overuse").count() == 1
+
+
+@check
+def usage_rollups(client):
+    def snapshot():
+        return sorted((r.department, r.category, r.bucket_start, r.usages_started, r.usages_completed,
+                       round(r.busy_seconds)) for r in UsageRollup.query.all())
+
+    incremental = snapshot()
+    assert sum(row[3] for row in incremental) == AssetUsage.query.count()
+    with db.engine.begin() as conn:
+        rebuild_usage_rollups(conn)
+    db.session.expire_all()
+    assert snapshot() == incremental
+
+
+@check
+def dashboard_paging(client):
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 2, "sort": "name", "order": "desc", "counts": "1"}
+        if cursor:
+            query["after"] = cursor
+        page = client.get("/api/dashboard/assets", query_string=query).get_json()
+        seen += [row["name"] for row in page["assets"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == sorted(seen, reverse=True) and len(seen) == page["total"] == Asset.query.count()
+    assert sum(page["counts"]["status"].values()) == page["total"]
+    for scanned in ("1", "0"):
+        filtered = client.get("/api/dashboard/assets", query_string={"scanned": scanned, "counts": "1"}).get_json()
+        assert all(sum(facet.values()) == filtered["total"] for facet in filtered["counts"].values()), filtered
+    rentals = client.get("/api/dashboard/assets", query_string={"ownership": "rental"}).get_json()
+    assert all(row["ownership"] == "rental" for row in rentals["assets"])
+    assert client.get("/api/dashboard/assets", query_string={"sort": "bogus"}).status_code == 400
+
+
+@check
+def utilization(client):
+    # Some checks post reads timestamped a few minutes ahead
+    now = datetime.utcnow()
+    end = now + timedelta(hours=1)
+    start = end - timedelta(days=2)
+    window = {"start": start.isoformat(), "end": end.isoformat()}
+    departments = client.get("/api/utilization", query_string=dict(window, by="department")).get_json()
+    expected = 0.0
+    for usage in AssetUsage.query.filter(AssetUsage.start_time < end):
+        clipped = min(usage.end_time or now, end) - max(usage.start_time, start)
+        expected += max(clipped.total_seconds(), 0)
+    reported = sum(stats["busy_hours"] for stats in departments["departments"].values())
+    assert abs(reported - expected / 3600) < 0.1, (reported, expected / 3600)
+    assert all(stats["peak_concurrent"] >= 1 for stats in departments["departments"].values())
+    assets = client.get("/api/utilization", query_string=dict(window, by="asset")).get_json()["assets"]
+    assert assets and all(0 <= row["utilization"] <= 100 for row in assets), assets
+
+
+@check
+def pages(client):
+    for path in ("/digital_assets_landing", "/reports", "/asset_management_dashboard",
+                 "/asset_management_dashboard?status=available&sort=last_usage&limit=1", "/scan_asset"):
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+
+
+@check
+def cached_user(client):
+    client.get("/digital_assets_landing")
+    response = client.get("/digital_assets_landing")
+    assert response.status_code == 200 and response.headers["X-DB-Queries"] == "0", response.headers
+    checker = User.query.filter_by(username="checker").one()
+    checker.department = "ER"
+    db.session.commit()
+    assert user_cache.get(checker.id).department == "ER"
+
+
+@check
+def bulk_alerts(client):
+    target = asset("CHK001").id
+    rows = [{"asset_id": target, "alert_type": "inactivity", "message": f"check {i}", "severity": "low"}
+            for i in range(app.config["BULK_COPY_THRESHOLD"] + 10)]
+    bulk_insert(Alert, rows)
+    db.session.commit()
+    assert Alert.query.filter_by(alert_type="inactivity").count() == len(rows)
+    assert Alert.query.filter_by(is_resolved=False).first().created_at is not None
+
+
+@check
+def maintenance_schedule(client):
+    before = client.get("/api/maintenance/due").get_json()
+    assert sum(before["windows"].values()) <= before["assets"] == Asset.query.count()
+    performed = datetime.utcnow() - timedelta(days=85)
+    response = client.post(f"/api/assets/{asset('CHK001').id}/maintenance",
+                           json={"performed_at": performed.isoformat(), "notes": "check"})
+    next_due = datetime.fromisoformat(response.get_json()["next_due"])
+    assert abs(next_due - (performed + timedelta(days=90))) < timedelta(seconds=1)
+    due = client.get("/api/maintenance/due", query_string={"window": "this_week"}).get_json()
+    assert "CHK001" in [row["asset_id"] for row in due["due"]]
+
+
+@check
+def alert_sweep(client):
+    stale = datetime.utcnow() - timedelta(days=40)
+    for tag in ("CHK001", "CHK002"):
+        asset(tag).last_usage = stale
+    db.session.commit()
+    first = client.post("/api/alerts/sweep").get_json()
+    # CHK001 already has open inactivity alerts from bulk_alerts
+    assert first["raised"] == 1, first
+    assert client.post("/api/alerts/sweep").get_json()["raised"] == 0
+    assert Alert.query.filter_by(asset_id=asset("CHK002").id, alert_type="inactivity").count() == 1
+
+
+@check
+def alert_grouping(client):
+    target = asset("CHK002").id
+    repeat = {"asset_id": target, "alert_type": "location_mismatch", "message": "repeat", "severity": "high"}
+    assert raise_alerts([repeat, repeat]) == (0, 1)
+    folded = Alert.query.filter_by(asset_id=target, alert_type="location_mismatch").one()
+    assert folded.occurrences == 3 and folded.message == "repeat"
+    groups = client.get("/api/alerts/groups", query_string={"by": "alert_type,department"}).get_json()
+    inactivity = sum(row["alerts"] for row in groups if row["alert_type"] == "inactivity")
+    assert inactivity == Alert.query.filter_by(alert_type="inactivity", is_resolved=False).count()
+    assert client.post("/api/alerts/resolve", json={}).status_code == 400
+    for ids in (["abc"], [None], "12"):
+        rejected = client.post("/api/alerts/resolve", json={"ids": ids})
+        assert rejected.status_code == 400 and "ids" in rejected.get_json()["error"]
+    resolved = client.post("/api/alerts/resolve", json={"alert_type": "inactivity"}).get_json()
+    assert resolved["resolved"] == inactivity
+    assert Alert.query.filter_by(alert_type="inactivity", is_resolved=False).count() == 0
+    assert Alert.query.filter(Alert.resolved_at.isnot(None)).count() == inactivity
+
+
+@check
+def asset_stream(client):
+    response = client.get("/api/assets/stream", query_string={"asset_id": "CHK002"}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    stream = iter(response.response)
+    next(stream)
+    moved = asset("CHK002")
+    moved.location = "Radiology"
+    asset("CHK001").location = "Radiology"
+    db.session.commit()
+    frame = next(stream).decode()
+    response.close()
+    assert frame.count("event: asset") == 1 and '"location":"Radiology"' in frame, frame
+
+
+@check
+def delete_rental(client):
+    since = client.get("/api/assets/changes", query_string={"since": 0}).get_json()["next_since"]
+    client.post("/register_asset", data={
+        "asset_type": "Wheelchair", "serial_number": "SN-CHECK-0002", "ownership_type": "rental",
+        "vendor": "Check Rentals", "initial_location": "Storage",
+    })
+    rental = Asset.query.filter_by(ownership="rental", status="unassociated").one()
+    rental_tag = rental.asset_id
+    assert client.get(f"/api/scan/{rental_tag}").get_json()["found"]
+    client.post(f"/delete_rental/{rental.id}")
+    db.session.expire_all()
+    assert db.session.get(Asset, rental.id) is None
+    assert not client.get(f"/api/scan/{rental_tag}").get_json()["found"]
+    delta = client.get("/api/assets/changes", query_string={"since": since}).get_json()
+    assert [row["id"] for row in delta["deleted"]] == [rental.id], delta
+    assert delta["next_since"] > since
+
+
+
+@check
+def fleet_time_travel(client):
+    def replayed(**query):
+        response = client.get("/api/fleet/at", query_string=query).get_json()
+        return {row["id"]: [row[name] for name in ("asset_id", "status", "location", "usage_id", "usage_status")]
+                for row in response["assets"]}
+
+    now = datetime.utcnow().isoformat()
+    assert replayed(time=now) == FleetHistory.current_states()
+    client.post("/api/fleet/checkpoints")
+    assert replayed(time=now) == FleetHistory.current_states()
+    tombstone = AssetTombstone.query.order_by(AssetTombstone.id.desc()).first()
+    before_delete = replayed(time=(tombstone.deleted_at - timedelta(milliseconds=1)).isoformat(),
+                             asset_id=tombstone.asset_id)
+    assert list(before_delete) == [tombstone.asset_pk], before_delete
+    assert client.get("/api/fleet/at", query_string={"time": "2000-01-01T00:00:00"}).status_code == 404
+
+def main():
+    print("🏥 Database Backend Check")
+    print("=" * 50)
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        print(f"🗄️  {db.engine.url.render_as_string(hide_password=True)} ({db.engine.dialect.name})")
+        if inspect(db.engine).get_table_names():
+            print("❌ Target database is not empty; point db_check.py at a scratch database")
+            sys.exit(1)
+
+        client = app.test_client()
+        failures = 0
+        for func in CHECKS:
+            try:
+                func(client)
+                print(f"✅ {func.__name__}")
+            except Exception:
+                failures += 1
+                db.session.rollback()
+                print(f"❌ {func.__name__}")
+                traceback.print_exc()
+
+    print()
+    print(f"{len(CHECKS) - failures}/{len(CHECKS)} checks passed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
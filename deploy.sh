@@ -43,7 +43,9 @@ User=ubuntu
 Group=www-data
 WorkingDirectory=/var/www/asset-tracker
 Environment="PATH=/var/www/asset-tracker/venv/bin"
-ExecStart=/var/www/asset-tracker/venv/bin/gunicorn --workers 3 --bind unix:/var/www/asset-tracker/asset-tracker.sock app:app
+# Live-update streams hold a thread each; keep them well below --threads
+Environment="SSE_MAX_CLIENTS=48"
+ExecStart=/var/www/asset-tracker/venv/bin/gunicorn --workers 3 --worker-class gthread --threads 64 --bind unix:/var/www/asset-tracker/asset-tracker.sock app:app
 
 [Install]
 WantedBy=multi-user.target
@@ -0,0 +1,32 @@
+"""QR label rendering, kept apart from app so label pool processes don't import the app"""
+from PIL import Image, ImageDraw, ImageFont
+import qrcode
+
+LABEL_SIZE = (740, 240)
+
+def _label_font(size):
+    try:
+        return ImageFont.truetype('DejaVuSans.ttf', size)
+    except OSError:
+        return ImageFont.load_default()
+
+def render_label(asset_id, name):
+    """Render one label tile (QR code, asset name and ID) as raw grayscale pixels"""
+    label = Image.new('L', LABEL_SIZE, 255)
+    qr = qrcode.QRCode(version=1, box_size=10, border=2)
+    qr.add_data(f"asset:{asset_id}")
+    qr.make(fit=True)
+    side = LABEL_SIZE[1] - 20
+    code = qr.make_image(fill_color="black", back_color="white").get_image().convert('L')
+    label.paste(code.resize((side, side), Image.NEAREST), (10, 10))
+
+    draw = ImageDraw.Draw(label)
+    text_x = side + 30
+    draw.text((text_x, 50), name[:32], font=_label_font(30), fill=0)
+    draw.text((text_x, 130), asset_id, font=_label_font(38), fill=0)
+    draw.rectangle([0, 0, LABEL_SIZE[0] - 1, LABEL_SIZE[1] - 1], outline=160)
+    return label.tobytes()
+
+def render_label_args(args):
+    """Pool entry point: render_label for one (asset_id, name) pair"""
+    return render_label(*args)
@@ -42,7 +42,7 @@ def send_rfid_event(asset_id, location, event_type):
     
     try:
         response = requests.post(f"{BASE_URL}/rfid_event", json=data)
-        if response.status_code == 200:
+        if response.ok:  # 202 when the read is queued
             print(f"✅ RFID Event: {asset_id} {event_type} {location}")
         else:
             print(f"❌ RFID Event Failed: {response.text}")
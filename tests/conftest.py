@@ -0,0 +1,57 @@
+"""Shared fixtures: one throwaway SQLite database per test session.
+
+The environment is set before app is imported, so the module-level
+services are built against the temporary database with every background
+thread turned off, as in db_check.py. Tests that need a thread start it
+themselves.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix='asset_tracking_tests_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp, 'tests.db')
+os.environ['RFID_QUEUE_PATH'] = os.path.join(_tmp, 'rfid_events.log')
+os.environ['RFID_QUEUE_ENABLED'] = '0'
+os.environ['RFID_DEDUP_WINDOW_SECONDS'] = '0'
+os.environ['ALERT_SWEEP_ENABLED'] = '0'
+os.environ['OVERDUE_SCHEDULER_ENABLED'] = '0'
+os.environ['LOCATION_COMPACT_ENABLED'] = '0'
+os.environ['FLEET_CHECKPOINT_ENABLED'] = '0'
+
+import app as asset_app  # noqa: E402
+
+ASSET_IDS = [f'TST{i:03d}' for i in range(10)]
+
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app = asset_app.app
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        asset_app.db.create_all()
+        asset_app.upgrade_schema()
+        asset_app.db.session.add(asset_app.User(
+            username='tester', email='tester@hospital.com', department='ICU', role='admin',
+            password_hash=asset_app.generate_password_hash('test123')))
+        for asset_id in ASSET_IDS:
+            asset_app.db.session.add(asset_app.Asset(
+                asset_id=asset_id, name=f'Wheelchair {asset_id}', category='wheelchair',
+                ownership='hospital', status='available', location='Storage'))
+        asset_app.db.session.commit()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def logged_in(client):
+    response = client.post('/login', data={'username': 'tester', 'password': 'test123'})
+    assert response.status_code == 302
+    return client
+
@@ -0,0 +1,72 @@
+"""Client slot lifecycle of the /api/assets/stream Server-Sent Events feed"""
+
+import json
+from datetime import datetime
+
+from app import asset_events
+
+
+def clients():
+    return asset_events.snapshot_stats()['clients']
+
+
+def test_head_is_refused_without_taking_a_slot(logged_in):
+    response = logged_in.head('/api/assets/stream')
+    assert response.status_code == 405
+    assert response.headers['Allow'] == 'GET'
+    assert clients() == 0
+
+
+def test_stream_requires_login(client):
+    assert client.get('/api/assets/stream').status_code == 302
+    assert clients() == 0
+
+
+def test_closing_an_unread_stream_releases_its_slot(logged_in):
+    response = logged_in.get('/api/assets/stream', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert clients() == 1
+    response.close()
+    assert clients() == 0
+
+
+def test_closing_a_read_stream_releases_its_slot(logged_in):
+    response = logged_in.get('/api/assets/stream', buffered=False)
+    assert next(iter(response.response)) == b'retry: 3000\n\n'
+    response.close()
+    assert clients() == 0
+
+
+def test_clients_over_the_cap_are_turned_away(logged_in, monkeypatch):
+    monkeypatch.setattr(asset_events, 'max_clients', 1)
+    first = logged_in.get('/api/assets/stream', buffered=False)
+    second = logged_in.get('/api/assets/stream', buffered=False)
+    assert second.status_code == 503
+    assert second.headers['Retry-After'] == '30'
+    assert clients() == 1
+    first.close()
+    assert clients() == 0
+    third = logged_in.get('/api/assets/stream', buffered=False)
+    assert third.status_code == 200
+    third.close()
+
+
+def test_subscriber_receives_matching_changes(app, logged_in, monkeypatch):
+    monkeypatch.setitem(app.config, 'SSE_HEARTBEAT_SECONDS', 5)
+    response = logged_in.get('/api/assets/stream?asset_id=TST003', buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+
+    for asset_id in ('TST004', 'TST003'):
+        logged_in.post('/rfid_event', json={'asset_id': asset_id, 'event_type': 'enter', 'location': 'ICU',
+                                            'timestamp': datetime.now().isoformat()})
+    frame = next(chunks).decode()
+    response.close()
+    assert clients() == 0
+
+    assert frame.startswith('id: ') and '\nevent: asset\n' in frame
+    messages = [json.loads(line[len('data: '):]) for line in frame.splitlines() if line.startswith('data: ')]
+    assert [message['asset_id'] for message in messages] == ['TST003']
+    assert messages[0]['status'] == 'in-use'
+    assert messages[0]['location'] == 'ICU'
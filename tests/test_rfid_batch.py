@@ -0,0 +1,69 @@
+"""Per-event validation on the /rfid_events batch endpoint"""
+
+from datetime import datetime
+
+from app import Asset
+
+
+def read(asset_id, event_type='enter', location='ICU', **fields):
+    return dict({'asset_id': asset_id, 'event_type': event_type, 'location': location,
+                 'timestamp': datetime.now().isoformat()}, **fields)
+
+
+def status_of(app, asset_id):
+    with app.app_context():
+        return Asset.query.filter_by(asset_id=asset_id).one().status
+
+
+def test_each_event_is_validated_on_its_own(app, client):
+    events = [
+        read('TST000'),
+        read(['TST001']),
+        read('TST001', event_type=None),
+        read('TST001', timestamp='yesterday'),
+        read('TST001', location=42),
+        read('NOPE999'),
+        'not an event',
+    ]
+    response = client.post('/rfid_events', json=events)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['processed'] == len(events)
+    assert body['applied'] == 1
+
+    results = body['results']
+    assert [result['index'] for result in results] == list(range(len(events)))
+    assert results[0]['success'] and results[0]['outcome'] == 'usage_started'
+    assert [result.get('error') for result in results[1:]] == [
+        'asset_id is required',
+        'event_type must be enter or exit',
+        'Invalid timestamp',
+        'location must be a string',
+        'Asset not found',
+        'Each event must be a JSON object',
+    ]
+    assert not any(result['success'] for result in results[1:])
+
+    # Rejected events do not roll back the valid one, and touch nothing themselves
+    assert status_of(app, 'TST000') == 'in-use'
+    assert status_of(app, 'TST001') == 'available'
+
+
+def test_events_wrapper_is_accepted(client):
+    response = client.post('/rfid_events', json={'events': [read('NOPE999', 'exit')]})
+    assert response.status_code == 200
+    assert response.get_json()['results'][0]['error'] == 'Asset not found'
+
+
+def test_body_that_is_not_a_list_is_rejected(client):
+    response = client.post('/rfid_events', json=read('TST001'))
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_oversized_batch_is_rejected_whole(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'RFID_BATCH_MAX_EVENTS', 2)
+    events = [read('TST001')] * 3
+    response = client.post('/rfid_events', json=events)
+    assert response.status_code == 413
+    assert status_of(app, 'TST001') == 'available'
@@ -0,0 +1,87 @@
+"""RFIDEventQueue: durable append, batched reads, offset replay and the writer thread"""
+
+import time
+from datetime import datetime
+
+from app import Asset, RFIDEventQueue
+
+
+def read(asset_id, event_type='enter', location='ICU'):
+    return {'asset_id': asset_id, 'event_type': event_type, 'location': location,
+            'timestamp': datetime.now().isoformat()}
+
+
+def open_queue(path, **kwargs):
+    """A queue that accepts appends without starting its writer thread"""
+    queue = RFIDEventQueue(str(path), **kwargs)
+    queue._log = open(queue.path, 'ab')
+    return queue
+
+
+def test_appended_reads_come_back_in_batches(tmp_path):
+    queue = open_queue(tmp_path / 'rfid.log', batch_size=2)
+    reads = [read(f'TAG{i}') for i in range(3)]
+    for event in reads:
+        queue.append(event)
+    assert queue.stats['enqueued'] == 3
+    assert queue.depth_bytes() == (tmp_path / 'rfid.log').stat().st_size
+
+    queue._acquire_writer()
+    events, position = queue._read_batch()
+    assert events == reads[:2]
+    queue._commit_offset(position)
+    events, position = queue._read_batch()
+    assert events == reads[2:]
+    queue._commit_offset(position)
+    assert queue.depth_bytes() == 0
+
+
+def test_invalid_lines_are_skipped_and_counted(tmp_path):
+    queue = open_queue(tmp_path / 'rfid.log')
+    queue.append(read('TAG1'))
+    queue.append({'asset_id': 'TAG2', 'event_type': 'sideways'})
+    with open(queue.path, 'ab') as f:
+        f.write(b'{not json\n')
+    queue.append(read('TAG3'))
+
+    queue._acquire_writer()
+    events, position = queue._read_batch()
+    assert [event['asset_id'] for event in events] == ['TAG1', 'TAG3']
+    assert queue.stats['failed'] == 2
+    assert position == (tmp_path / 'rfid.log').stat().st_size
+
+
+def test_restarted_writer_replays_from_the_committed_offset(tmp_path):
+    path = tmp_path / 'rfid.log'
+    before = open_queue(path, batch_size=1)
+    reads = [read(f'TAG{i}') for i in range(3)]
+    for event in reads:
+        before.append(event)
+    # The previous writer committed only the first read, then died mid-append
+    with open(path, 'rb') as f:
+        before._commit_offset(len(f.readline()))
+    with open(path, 'ab') as f:
+        f.write(b'{"asset_id": "TORN"')
+
+    after = open_queue(path, batch_size=10)
+    after._acquire_writer()
+    assert not path.read_bytes().endswith(b'"TORN"')
+    events, position = after._read_batch()
+    assert events == reads[1:]
+    assert position == path.stat().st_size
+
+
+def test_writer_thread_applies_queued_reads(app, tmp_path):
+    queue = RFIDEventQueue(str(tmp_path / 'rfid.log'))
+    queue.start(app)
+    queue.append(read('TST002'))
+    queue.append(read('NOPE999'))
+
+    deadline = time.monotonic() + 10
+    while queue.stats['applied'] + queue.stats['failed'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert queue.stats['writer'] is True
+    assert (queue.stats['applied'], queue.stats['failed']) == (1, 1)
+    assert queue.depth_bytes() == 0
+    with app.app_context():
+        assert Asset.query.filter_by(asset_id='TST002').one().status == 'in-use'